@@ -111,8 +111,40 @@ function getMaxWorkAreaWidth(object)
     return MathUtil.round(width, 3), MathUtil.round(offset, 3)
 end
 
+-- Work areas only change when implements are attached/detached or the spray type changes, so each object's width is
+-- cached instead of building a guide node and walking every work area on each export. Weak keys let sold vehicles go.
+local widthCache = setmetatable({}, { __mode = "k" })
+
+local function getCachedWorkAreaWidth(object)
+    local sprayType = getActiveSprayType(object)
+    local cached = widthCache[object]
+
+    if cached == nil or cached.sprayType ~= sprayType then
+        local width, offset = getMaxWorkAreaWidth(object)
+        cached = { width = width, offset = offset, sprayType = sprayType }
+        widthCache[object] = cached
+    end
+
+    return cached.width, cached.offset
+end
+
+-- Identifies the set of implements attached under an object, changes when anything is attached or detached
+local function getAttachSignature(object)
+    local signature = tostring(object.rootNode)
+
+    if object.getAttachedImplements ~= nil then
+        for _, implement in pairs(object:getAttachedImplements()) do
+            if implement.object ~= nil then
+                signature = signature .. "(" .. getAttachSignature(implement.object) .. ")"
+            end
+        end
+    end
+
+    return signature
+end
+
 function getActualWorkWidth(object)
-    local width, offset = getMaxWorkAreaWidth(object)
+    local width, offset = getCachedWorkAreaWidth(object)
 
     for _, implement in pairs(object:getAttachedImplements()) do
         if implement.object ~= nil then
@@ -139,15 +171,7 @@ local function getRotation(item)
     return heading
 end
 
-local function printTransform(xmlFile, vehicle, tool)
-    if xmlFile == nil then
-        print("self.xmlFile is nil")
-        return
-    end
-
-    local vx, vy, vz = getWorldTranslation(vehicle.rootNode)
-    local tx, ty, tz = getWorldTranslation(tool.rootNode)
-
+local function getToolState(tool)
     local on = false
     if tool.getIsTurnedOn ~= nil then
         on = tool:getIsTurnedOn()
@@ -158,39 +182,250 @@ local function printTransform(xmlFile, vehicle, tool)
         lowered = tool:getIsLowered()
     end
 
+    return on, lowered
+end
+
+-- One record per implement anywhere in the attach tree (front and rear tools, trailed tools behind trailed tools)
+local function collectImplements(object, records)
+    if object.getAttachedImplements == nil then
+        return records
+    end
+
+    for _, implement in pairs(object:getAttachedImplements()) do
+        local tool = implement.object
 
-    local vry = getRotation(vehicle)
-    local try = getRotation(tool)
+        if tool ~= nil then
+            local tx, ty, tz = getWorldTranslation(tool.rootNode)
+            local on, lowered = getToolState(tool)
+
+            -- Only the tool's own work areas, anything attached to it gets its own record
+            local width, offset = getCachedWorkAreaWidth(tool)
+
+            table.insert(records, {
+                id = tool.rootNode,
+                tx = tx, ty = ty, tz = tz, try = getRotation(tool),
+                width = width, offset = offset,
+                on = on, lowered = lowered
+            })
+
+            collectImplements(tool, records)
+        end
+    end
+
+    return records
+end
+
+local function collectState(vehicle, tool)
+    local vx, vy, vz = getWorldTranslation(vehicle.rootNode)
+    local tx, ty, tz = getWorldTranslation(tool.rootNode)
+
+    local on, lowered = getToolState(tool)
 
     local width, offset = getActualWorkWidth(vehicle)
 
-    local toolType = tool.typeName
+    return {
+        vx = vx, vy = vy, vz = vz, vry = getRotation(vehicle),
+        tx = tx, ty = ty, tz = tz, try = getRotation(tool),
+        toolOn = on, toolLowered = lowered,
+        workWidth = width, workOffset = offset,
+        implements = collectImplements(vehicle, {})
+    }
+end
+
+local STATE_KEYS = {
+    position = { "vx", "vy", "vz", "tx", "ty", "tz", "workWidth", "workOffset" },
+    rotation = { "vry", "try" },
+    exact = { "toolOn", "toolLowered" }
+}
+
+local IMPLEMENT_KEYS = {
+    position = { "tx", "ty", "tz", "width", "offset" },
+    rotation = { "try" },
+    exact = { "id", "on", "lowered" }
+}
+
+local function recordChanged(config, keys, last, record)
+    for _, key in ipairs(keys.exact) do
+        if last[key] ~= record[key] then
+            return true
+        end
+    end
+
+    for _, key in ipairs(keys.position) do
+        if math.abs(last[key] - record[key]) > config.positionEpsilon then
+            return true
+        end
+    end
+
+    for _, key in ipairs(keys.rotation) do
+        -- Headings wrap at 360
+        local diff = math.abs(last[key] - record[key]) % 360
+        if math.min(diff, 360 - diff) > config.rotationEpsilon then
+            return true
+        end
+    end
+
+    return false
+end
+
+local function stateChanged(config, last, state)
+    if last == nil or #last.implements ~= #state.implements then
+        return true
+    end
+
+    if recordChanged(config, STATE_KEYS, last, state) then
+        return true
+    end
+
+    for i, record in ipairs(state.implements) do
+        if recordChanged(config, IMPLEMENT_KEYS, last.implements[i], record) then
+            return true
+        end
+    end
+
+    return false
+end
+
+local function writeState(xmlFile, state, seq)
+    if xmlFile == nil then
+        print("self.xmlFile is nil")
+        return
+    end
 
-    --print(string.format(
-    --    "TopconX35 {'vx': %.2f, 'vy': %.2f, 'vz': %.2f, 'vry': %.2f, 'tx': %.2f, 'ty': %.2f, 'tz': %.2f, 'try': %.2f, 'on': %s, 'lowered': %s, 'work_width': %s, 'tool_type': %s}",
-    --    vx, vy, vz, vry, tx, ty, tz, try, on, lowered, width, toolType))
+    xmlFile:setInt("state.seq", seq)
 
-    xmlFile:setFloat("state.vx", vx)
-    xmlFile:setFloat("state.vy", vy)
-    xmlFile:setFloat("state.vz", vz)
-    xmlFile:setFloat("state.vry", vry)
+    xmlFile:setFloat("state.vx", state.vx)
+    xmlFile:setFloat("state.vy", state.vy)
+    xmlFile:setFloat("state.vz", state.vz)
+    xmlFile:setFloat("state.vry", state.vry)
 
     -- Tool/world transform
-    xmlFile:setFloat("state.tx", tx)
-    xmlFile:setFloat("state.ty", ty)
-    xmlFile:setFloat("state.tz", tz)
-    xmlFile:setFloat("state.try", try)
+    xmlFile:setFloat("state.tx", state.tx)
+    xmlFile:setFloat("state.ty", state.ty)
+    xmlFile:setFloat("state.tz", state.tz)
+    xmlFile:setFloat("state.try", state.try)
 
     -- Tool state
-    xmlFile:setBool("state.toolOn", on)
-    xmlFile:setBool("state.toolLowered", lowered)
+    xmlFile:setBool("state.toolOn", state.toolOn)
+    xmlFile:setBool("state.toolLowered", state.toolLowered)
 
     -- Work data
-    xmlFile:setFloat("state.workWidth", width)
+    xmlFile:setFloat("state.workWidth", state.workWidth)
+    xmlFile:setFloat("state.workOffset", state.workOffset) -- Metres the worked area's centre is left of the tool's centre
+
+    -- Every implement, <implements><implement id="" tx="" .../></implements>
+    xmlFile:removeProperty("state.implements")
+    for i, record in ipairs(state.implements) do
+        local key = string.format("state.implements.implement(%d)", i - 1)
+
+        xmlFile:setInt(key .. "#id", record.id)
+        xmlFile:setFloat(key .. "#tx", record.tx)
+        xmlFile:setFloat(key .. "#ty", record.ty)
+        xmlFile:setFloat(key .. "#tz", record.tz)
+        xmlFile:setFloat(key .. "#try", record.try)
+        xmlFile:setFloat(key .. "#width", record.width)
+        xmlFile:setFloat(key .. "#offset", record.offset)
+        xmlFile:setBool(key .. "#on", record.on)
+        xmlFile:setBool(key .. "#lowered", record.lowered)
+    end
 
     xmlFile:save()
 end
 
+local STREAM_TAG = "X35"
+
+local function flag(value)
+    if value then
+        return "1"
+    end
+
+    return "0"
+end
+
+-- One compact line per state, field order matches STATE_FIELDS and IMPLEMENT_FIELDS in the server's ingest.py
+local function formatStateLine(state, seq)
+    local fields = {
+        STREAM_TAG,
+        string.format("%d %.3f %.3f %.3f %.2f", seq, state.vx, state.vy, state.vz, state.vry),
+        string.format("%.3f %.3f %.3f %.2f", state.tx, state.ty, state.tz, state.try),
+        flag(state.toolOn), flag(state.toolLowered),
+        string.format("%.3f %.3f %d", state.workWidth, state.workOffset, #state.implements)
+    }
+
+    for _, record in ipairs(state.implements) do
+        table.insert(fields, string.format("%d %.3f %.3f %.3f %.2f %.3f %.3f", record.id, record.tx, record.ty, record.tz, record.try, record.width, record.offset))
+        table.insert(fields, flag(record.on))
+        table.insert(fields, flag(record.lowered))
+    end
+
+    return table.concat(fields, " ") .. "\n"
+end
+
+local function openStream(path)
+    -- Write access starts the file over, the server sees it shrink and reads from the start again
+    local file = createFile(path, FileAccess.WRITE)
+    if file == nil or file == 0 then
+        print(string.format("Topcon: couldn't open state stream (%s), falling back to state.xml", path))
+        return nil
+    end
+
+    return file
+end
+
+function TopconX35:writeStream(state, seq)
+    local line = formatStateLine(state, seq)
+
+    if self.streamBytes + #line > self.config.streamMaxBytes then
+        delete(self.streamFile)
+        self.streamFile = openStream(self.streamPath)
+        self.streamBytes = 0
+
+        if self.streamFile == nil then
+            return
+        end
+    end
+
+    fileWrite(self.streamFile, line)
+    self.streamBytes = self.streamBytes + #line
+end
+
+-- Export limits, overridden by modSettings/TopconX35/config.xml
+TopconX35.DEFAULT_CONFIG = {
+    exportHz = 20, -- Most state.xml saves per second
+    heartbeatMs = 1000, -- Unchanged state is still saved this often so the server can tell the game is running
+    positionEpsilon = 0.01, -- Metres a position (or the work width) has to move before it is exported
+    rotationEpsilon = 0.1, -- Degrees a heading has to turn before it is exported
+    streamExport = 0, -- 1 appends a line per export to state.log instead of saving state.xml (server "ingest_mode": "stream")
+    streamMaxBytes = 1048576 -- state.log is started over once it would grow past this
+}
+
+local function loadConfig(settingsDir)
+    local config = {}
+    for key, value in pairs(TopconX35.DEFAULT_CONFIG) do
+        config[key] = value
+    end
+
+    local configPath = settingsDir .. "config.xml"
+    local configFile = XMLFile.loadIfExists("TopconX35Config", configPath)
+
+    if configFile == nil then
+        -- Write the defaults out so they can be edited
+        configFile = XMLFile.create("TopconX35Config", configPath, "config")
+        for key, value in pairs(config) do
+            configFile:setFloat("config." .. key, value)
+        end
+        configFile:save()
+    else
+        for key, value in pairs(config) do
+            config[key] = Utils.getNoNil(configFile:getFloat("config." .. key), value)
+        end
+    end
+
+    configFile:delete()
+
+    return config
+end
+
 function TopconX35:loadMap(name)
     local settingsDir = getUserProfileAppPath() .. "modSettings/TopconX35/"
     createFolder(settingsDir)
@@ -207,29 +442,88 @@ function TopconX35:loadMap(name)
     end
 
     self.xmlFile = xmlFile
+    self.config = loadConfig(settingsDir)
+
+    self.streamPath = settingsDir .. "state.log"
+    self.streamFile = nil
+    self.streamBytes = 0
+
+    if self.config.streamExport == 1 then
+        self.streamFile = openStream(self.streamPath)
+    end
+
+    self.seq = 0
+    self.lastState = nil
+    self.attachSignature = nil
+    self.timeSinceExport = 0
+    self.timeSinceSave = 0
 
     print("TopconX35 mod loaded.")
 end
 
 function TopconX35:update(dt)
+    self.timeSinceExport = self.timeSinceExport + dt
+    self.timeSinceSave = self.timeSinceSave + dt
+
+    -- At most one export per frame, and no more than exportHz
+    if self.timeSinceExport < 1000 / self.config.exportHz then
+        return
+    end
+
     local vehicle = g_currentMission.controlledVehicle
-    if vehicle ~= nil then
-        -- Check for attached implement/tool
-        if vehicle.getAttachedImplements ~= nil then
-            for _, implement in pairs(vehicle:getAttachedImplements()) do
-                if implement.object ~= nil then
-                    printTransform(self.xmlFile, vehicle, implement.object)
-                    
-                end
-            end
-        else
-            
-            --printTransform(self.xmlFile, vehicle, vehicle)
+    if vehicle == nil or vehicle.getAttachedImplements == nil then
+        return
+    end
+
+    -- Check for attached implement/tool, the last one is exported (it used to overwrite the others each frame)
+    local tool = nil
+    for _, implement in pairs(vehicle:getAttachedImplements()) do
+        if implement.object ~= nil then
+            tool = implement.object
+        end
+    end
+
+    if tool == nil then
+        return
+    end
+
+    self.timeSinceExport = 0
+
+    local attachSignature = getAttachSignature(vehicle)
+    if attachSignature ~= self.attachSignature then
+        for object in pairs(widthCache) do
+            widthCache[object] = nil
         end
+
+        self.attachSignature = attachSignature
     end
+
+    local state = collectState(vehicle, tool)
+    local changed = stateChanged(self.config, self.lastState, state)
+    if not changed and self.timeSinceSave < self.config.heartbeatMs then
+        return
+    end
+
+    -- Heartbeats keep the last sequence number so the server can tell them apart from real changes
+    if changed then
+        self.seq = self.seq + 1
+        self.lastState = state
+    end
+
+    if self.streamFile ~= nil then
+        self:writeStream(state, self.seq)
+    else
+        writeState(self.xmlFile, state, self.seq)
+    end
+
+    self.timeSinceSave = 0
 end
 
 function TopconX35:deleteMap()
+    if self.streamFile ~= nil then
+        delete(self.streamFile)
+        self.streamFile = nil
+    end
 end
 
 addModEventListener(TopconX35)
@@ -0,0 +1,185 @@
+import json
+
+from array import array
+from time import sleep, perf_counter
+from g29 import Wheel
+
+class Calibrator:
+    """
+    Measures how the wheel responds to constant force steps and fits the Wheel steering loop settings from it.
+    Model: once the force offset `u` passes the deadband `u0`, the rim settles at a speed of `gain * (u - u0)`, running `lag` seconds behind.
+    """
+
+    FORCE_STEPS = (0.02, 0.04, 0.06, 0.1, 0.15, 0.2, 0.3) # Force offsets from neutral (0.5), applied in both directions
+    STEP_DURATION = 0.6 # Seconds each force is held for
+    START_OFFSET = 0.4 # Steps start this far to the opposite side of centre so there is room to travel
+    MAX_TRAVEL = 0.7 # Steps end early once the rim has moved this far so it never reaches full lock
+    REST_DURATION = 0.5 # Seconds recorded with forces off to measure sensor noise
+    SETTLE_DURATION = 0.3 # Seconds left for the rim to coast to a stop before measuring noise
+    POSITION_TIMEOUT = 3.0
+    POSITION_TOLERANCE = 0.02
+
+    MIN_TIME_CONSTANT = 0.15 # Seconds. Fastest closed loop response the fitted gains aim for
+    LAG_TIME_CONSTANTS = 1 # Closed loop time constant is kept at least this many lags long to avoid hunting
+
+    def __init__(self, wheel: Wheel) -> None:
+        self.wheel = wheel
+
+    def record(self, duration: float, start_rot: float | None = None, max_travel: float | None = None) -> tuple[array, array]:
+        """Returns: (times, positions) of every report received in `duration` seconds, times relative to the start."""
+
+        times = array('d')
+        positions = array('d')
+
+        last_seq = -1
+        start = perf_counter()
+
+        while (now := perf_counter()) - start < duration:
+            snapshot = self.wheel.get_snapshot()
+
+            if snapshot.seq != last_seq:
+                last_seq = snapshot.seq
+                times.append(now - start)
+                positions.append(snapshot.steering)
+
+                if max_travel is not None and abs(snapshot.steering - start_rot) > max_travel:
+                    break
+
+            sleep(0.0002)
+
+        return times, positions
+
+    def move_to(self, target: float) -> None:
+        """Uses the normal steering loop to park the rim, then hands the wheel back to the calibrator."""
+
+        self.wheel.paused = False
+        self.wheel.release()
+        self.wheel.set_target(target)
+
+        start = perf_counter()
+        while abs(self.wheel.get_snapshot().steering - target) > self.POSITION_TOLERANCE and perf_counter() - start < self.POSITION_TIMEOUT:
+            sleep(0.01)
+
+        self.wheel.release()
+        self.wheel.paused = True
+        sleep(0.05) # Lets an actuator update that was already running finish before taking over
+
+        self.wheel.write_force(None)
+        sleep(0.1)
+
+    def fit_steady_speed(self, times: array, positions: array) -> tuple[float, float]:
+        """Returns: (speed, position at t = 0) of a least squares line over the last third of a step, where the rim has reached a steady speed."""
+
+        start = len(times) * 2 // 3
+        n = len(times) - start
+        if n < 2: return 0.0, 0.0
+
+        mean_t = sum(times[start:]) / n
+        mean_x = sum(positions[start:]) / n
+
+        cov = sum((times[i] - mean_t) * (positions[i] - mean_x) for i in range(start, len(times)))
+        var = sum((times[i] - mean_t) ** 2 for i in range(start, len(times)))
+
+        slope = cov / var if var > 0 else 0.0
+        return slope, mean_x - slope * mean_t
+
+    def run_step(self, force: float, direction: int, threshold: float) -> tuple[float, float | None]:
+        """
+        Returns: (steady speed in the step direction, lag in seconds or `None` if the rim didn't move).
+        Lag is where the steady speed line crosses the start position, i.e. the dead time plus the time the rim's inertia takes to spin up.
+        """
+
+        self.move_to(-direction * self.START_OFFSET)
+        start_rot = self.wheel.get_snapshot().steering
+
+        # Forces above 0.5 turn the wheel towards negative steering
+        self.wheel.write_force(0.5 - direction * force)
+        times, positions = self.record(self.STEP_DURATION, start_rot, self.MAX_TRAVEL)
+        self.wheel.write_force(None)
+
+        if len(positions) == 0 or abs(positions[-1] - start_rot) < threshold:
+            return 0.0, None
+
+        speed, intercept = self.fit_steady_speed(times, positions)
+        if speed * direction <= 0:
+            return 0.0, None
+
+        return speed * direction, max(0.0, (start_rot - intercept) / speed)
+
+    def calibrate(self) -> dict[str, float]:
+        self.move_to(0.0)
+        sleep(self.SETTLE_DURATION)
+
+        times, positions = self.record(self.REST_DURATION)
+        noise = max(positions) - min(positions) if len(positions) > 0 else 0.0
+        resolution = 1 / 32767.5 # One count of the 16 bit steering value
+        threshold = max(noise, resolution) * 4
+
+        points = [] # (force, steady speed)
+        lags = [] # (force, lag)
+
+        for force in self.FORCE_STEPS:
+            for direction in (1, -1):
+                speed, lag = self.run_step(force, direction, threshold)
+                print(f"Force {force * direction:+.2f}: speed {speed:.3f}/s, lag {lag if lag is None else round(lag, 3)}s")
+
+                if lag is not None:
+                    points.append((force, speed))
+                    lags.append((force, lag))
+
+        self.move_to(0.0)
+        self.wheel.paused = False
+
+        if len(set(force for force, speed in points)) < 2:
+            raise Exception("Wheel didn't respond to enough calibration forces to fit its response!")
+
+        # Least squares line through (force, speed), its force axis intercept is the deadband
+        n = len(points)
+        mean_u = sum(u for u, v in points) / n
+        mean_v = sum(v for u, v in points) / n
+        gain = sum((u - mean_u) * (v - mean_v) for u, v in points) / sum((u - mean_u) ** 2 for u, v in points)
+        deadband = max(0.0, mean_u - mean_v / gain)
+
+        # Near the deadband the rim barely moves within a step, so the lag is taken from the strongest half of the responses
+        strongest = sorted(lags)[len(lags) // 2:]
+        lag = sorted(lag for force, lag in strongest)[len(strongest) // 2]
+
+        time_constant = max(self.MIN_TIME_CONSTANT, self.LAG_TIME_CONSTANTS * lag)
+        kp = 1 / (gain * time_constant)
+        steer_accuracy = max(noise, resolution)
+
+        return {
+            "steer_kp": round(kp, 4),
+            "steer_ki": 0.0,
+            "steer_kd": round(kp * lag / 2, 4),
+            "steer_feed_forward": round(deadband, 4),
+            "steer_accuracy": round(steer_accuracy, 6),
+            "intro_steer_accuracy": round(max(steer_accuracy * 4, 0.002), 6),
+            "startup_kick": round(min(0.3, max(0.05, deadband * 2 + 0.02)), 4),
+            "calibrated_gain": round(gain, 4),
+            "calibrated_lag": round(lag, 4)
+        }
+
+def run_calibration(settings_path: str = "settings.json") -> None:
+    with open(settings_path, "r") as f:
+        settings = json.loads(f.read())
+
+    wheel = Wheel(settings, lambda: print("Wheel moved by hand during calibration!"), lambda: None)
+
+    try:
+        results = Calibrator(wheel).calibrate()
+    finally:
+        wheel.release()
+        wheel.write_force(None)
+        wheel.connected = False
+
+    print(f"Calibration results: {results}")
+
+    settings.update(results)
+    with open(settings_path, "w") as f:
+        f.write(json.dumps(settings))
+
+    print(f"Saved calibration to {settings_path}.")
+
+if __name__ == "__main__":
+    run_calibration()
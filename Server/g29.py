@@ -1,14 +1,28 @@
 from g29py import G29
-from time import sleep
-from math import sqrt
+from g29py.params import MASK_SHARE
+from threading import Thread
+from queue import Empty
+from time import sleep, perf_counter
+from metrics import METRICS
 
 class Wheel(G29):
-    INTRO_STEER_ACCURACY = 0.01
+    INTRO_STEER_ACCURACY = 0.01 # Error the target has to be out by before the actuator starts driving the wheel
     STEER_ACCURACY = 0.00001 # Percentage of accuracy the rotate functions have (+/-)
     DISCONNECT_DIFF = 0.1 # Percentage limit of how far out dist is from closest_dist is before disconnect
 
-    def __init__(self, settings: dict, on_wheel_disconnect: object, on_connect_pressed: object) -> None:
+    ACTUATOR_HZ = 100
+    STEER_KP = 1.0
+    STEER_KI = 0.0
+    STEER_KD = 0.05
+    STEER_FEED_FORWARD = 0.1 # Force always added in the direction of the error to get past the wheel's friction
+    MAX_STEER_FORCE = 0.5 # Largest offset from the neutral force (0.5) the actuator can apply
+    STARTUP_KICK = 0.2 # Force offset used to nudge the wheel both ways so it starts reporting
+    EVENT_TIMEOUT = 0.5 # Seconds the event thread waits for a button before checking the wheel is still connected
+
+    def __init__(self, settings: dict, on_wheel_disconnect: object, on_connect_pressed: object, device: object = None) -> None:
         """
+        Hot paths should read self.get_snapshot(), which has the buttons as a bitmask (MASK_* in g29py.params).
+
         For: self.get_state()["buttons"]
 
         {
@@ -40,7 +54,7 @@ class Wheel(G29):
         }
         """
 
-        super().__init__()
+        super().__init__(device)
 
         self.on_wheel_disconnect = on_wheel_disconnect
         self.on_connect_pressed = on_connect_pressed
@@ -49,81 +63,168 @@ class Wheel(G29):
         self.STEER_ACCURACY = float(settings.get("steer_accuracy", self.STEER_ACCURACY)) # Percentage of accuracy the rotate functions have (+/-)
         self.DISCONNECT_DIFF = float(settings.get("disconnect_diff", self.DISCONNECT_DIFF)) # Percentage limit of how far out dist is from closest_dist is before disconnect
 
-        self.last_connect_pressed = False
+        self.ACTUATOR_HZ = float(settings.get("actuator_hz", self.ACTUATOR_HZ))
+        self.STEER_KP = float(settings.get("steer_kp", self.STEER_KP))
+        self.STEER_KI = float(settings.get("steer_ki", self.STEER_KI))
+        self.STEER_KD = float(settings.get("steer_kd", self.STEER_KD))
+        self.STEER_FEED_FORWARD = float(settings.get("steer_feed_forward", self.STEER_FEED_FORWARD))
+        self.MAX_STEER_FORCE = float(settings.get("max_steer_force", self.MAX_STEER_FORCE))
+        self.STARTUP_KICK = float(settings.get("startup_kick", self.STARTUP_KICK))
 
         self.listen()
 
         # Need to move wheel for the script to get data (idk why)
-        self.force_constant(0.3)
+        self.force_constant(0.5 - self.STARTUP_KICK)
         sleep(0.2)
-        self.force_constant(0.7)
+        self.force_constant(0.5 + self.STARTUP_KICK)
         sleep(0.2)
         self.force_off()
 
         print("Waiting for wheel...")
-        while self.get_state()["steering"] == 0.0:
+        while self.get_snapshot().steering == 0.0:
             sleep(0.1)
 
         print("Wheel movement detected.")
 
+        self.target_steer = None # Set continuously by the server, `None` leaves the wheel to the driver
         self.is_rotating = False
-        self._stop_autorotate = False
-        self.target_steer = 0.0
+        self.driver_override = False # Set when the driver takes the wheel, targets are ignored until autosteer is released
+
+        self.last_force = None # Last value written to the device, `None` when forces are off
+        self.paused = False # Stops the actuator loop writing forces without stopping the thread
+
+        self.actuator_thread = Thread(target=self.run_actuator, daemon=True)
+        self.actuator_thread.start()
+
+        self.event_thread = Thread(target=self.run_events, daemon=True)
+        self.event_thread.start()
+
+    def set_target(self, target: float) -> None:
+        if self.driver_override: return
 
-    def rotate_to(self, speed: float) -> None:
-        speed /= 2
+        self.target_steer = target
 
-        curr_rot = self.get_state()["steering"]
-        dist = abs(self.target_steer - curr_rot)
+    def release(self) -> None:
+        self.target_steer = None
+        self.driver_override = False
 
-        if dist < self.INTRO_STEER_ACCURACY: return
+    def write_force(self, force: float | None) -> None:
+        """Sends a constant force (or turns forces off with `None`), skipping writes that wouldn't change what the wheel is doing."""
 
-        closest_dist = dist
+        if force is not None:
+            force = round(int(min(1.0, max(0.0, force)) * 255)) # Same quantisation as `force_constant`
 
-        #print(dist, self.INTRO_STEER_ACCURACY)
+        if force == self.last_force: return
 
-        self.is_rotating = True
+        if force is None:
+            self.force_off()
+        else:
+            self.force_constant(force / 255)
 
-        while dist > self.STEER_ACCURACY and not self._stop_autorotate:
-            curr_rot = self.get_state()["steering"]
-            dist = abs(self.target_steer - curr_rot)
+        self.last_force = force
+        METRICS.inc("hid_writes_total")
 
-            if dist < closest_dist:
-                closest_dist = dist
+    def run_actuator(self) -> None:
+        """Fixed rate PID position loop driving the wheel towards `target_steer`."""
 
-            if abs(dist - closest_dist) > self.DISCONNECT_DIFF:
-                print("Disconnect by wheel")
-                self.on_wheel_disconnect()
-                break
+        period = 1 / self.ACTUATOR_HZ
+        next_update = perf_counter()
 
-            curr_speed = max(sqrt(dist/6), min(speed, 0.100))
-            curr_speed = min(max(curr_speed, 0), 0.5)
-            #print(curr_speed)
+        last_time = None
+        last_rot = None
+        last_target = None
+        integral = 0.0
+        closest_dist = 0.0
+
+        while self.connected:
+            target = self.target_steer
+            curr_rot = self.get_snapshot().steering
+            now = perf_counter()
+
+            error = 0.0 if target is None else target - curr_rot
+            dist = abs(error)
+
+            if self.paused:
+                # Something else (calibration) is driving the wheel directly
+                self.is_rotating = False
+                integral = 0.0
+
+            elif target is None or (not self.is_rotating and dist < self.INTRO_STEER_ACCURACY) or (self.is_rotating and dist < self.STEER_ACCURACY):
+                self.is_rotating = False
+                integral = 0.0
+                self.write_force(None)
 
-            if self.target_steer < curr_rot:
-                self.force_constant(0.5 + curr_speed)
             else:
-                self.force_constant(0.5 - curr_speed)
+                if not self.is_rotating:
+                    self.is_rotating = True
+                    closest_dist = dist
+                    last_time = None
+                    last_target = target
 
-        self._stop_autorotate = False
-        self.force_off()
-        self.is_rotating = False
+                # A moving target legitimately moves the error away from the best seen so far
+                closest_dist += abs(target - last_target)
+                last_target = target
+
+                if dist < closest_dist:
+                    closest_dist = dist
+
+                if abs(dist - closest_dist) > self.DISCONNECT_DIFF:
+                    print("Disconnect by wheel")
+                    # Override first so a `set_target` from the server thread in between can't put a target back
+                    self.driver_override = True
+                    self.target_steer = None
+                    self.is_rotating = False
+                    self.write_force(None)
+                    self.on_wheel_disconnect()
+                    METRICS.inc("wheel_disconnects_total")
+
+                else:
+                    dt = period if last_time is None else max(now - last_time, 1e-6)
+                    integral += error * dt
+
+                    # Derivative on the measurement so target jumps don't kick the wheel
+                    rot_rate = 0.0 if last_time is None else (curr_rot - last_rot) / dt
+
+                    u = self.STEER_KP * error + self.STEER_KI * integral - self.STEER_KD * rot_rate
+                    u += self.STEER_FEED_FORWARD if error > 0 else -self.STEER_FEED_FORWARD
+                    u = min(self.MAX_STEER_FORCE, max(-self.MAX_STEER_FORCE, u))
+
+                    # Forces above 0.5 turn the wheel towards negative steering
+                    self.write_force(0.5 - u)
+
+                    last_time = now
+                    last_rot = curr_rot
+
+            METRICS.inc("wheel_loop_iterations_total")
+
+            next_update += period
+            delay = next_update - perf_counter()
+
+            if delay > 0:
+                sleep(delay)
+            else:
+                next_update = perf_counter()
 
-    def update(self) -> None:
-        connect_pressed = self.get_state()["buttons"]["misc"]["Share"]
+    def run_events(self) -> None:
+        """Reacts to button edges decoded by the pump thread."""
 
-        if connect_pressed and not self.last_connect_pressed:
-            self.on_connect_pressed()
+        while self.connected:
+            try:
+                event = self.button_events.get(timeout=self.EVENT_TIMEOUT)
+            except Empty:
+                continue
 
-        self.last_connect_pressed = connect_pressed
+            if event.pressed & MASK_SHARE:
+                self.on_connect_pressed()
 
 if __name__ == "__main__":
-    wheel = Wheel()
+    wheel = Wheel({}, lambda: print("Disconnected by driver"), lambda: print("Connect pressed"))
 
     sleep(1)
 
-    wheel.rotate_to(-0.3, 0.5)
+    wheel.set_target(-0.3)
 
     #exit()
     while 1:
-        print(wheel.get_state()["steering"])
\ No newline at end of file
+        print(wheel.get_snapshot().steering)
+        sleep(0.1)
@@ -1,3 +1,4 @@
 from .g29 import G29
+from .mock import MockG29Device
 __version__ = '0.0.10'
-__all__ = ['G29']
+__all__ = ['G29', 'MockG29Device']
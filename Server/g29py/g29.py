@@ -1,65 +1,81 @@
-import hid
 import time
 import threading
 import logging as log
-from evdev import InputDevice, list_devices
 import os
+import queue
+import struct
+from typing import NamedTuple
 from .params import *
+from .mock import MockG29Device
+
+# Only needed for real hardware, the mock device works without them
+try:
+    import hid
+except ImportError:
+    hid = None
+
+try:
+    from evdev import InputDevice, list_devices
+except ImportError:
+    InputDevice = list_devices = None
+
+MOCK_ENV = "G29_MOCK" # Set to 1 to use a simulated wheel instead of looking for a real one
+
+class G29Snapshot(NamedTuple):
+    """Immutable wheel state published by the pump thread. A new one replaces the old on every report, so readers never need a lock."""
+
+    seq: int = 0 # Incremented on every published report
+    steering: float = 0.0
+    accelerator: float = -1.0
+    brake: float = -1.0
+    clutch: float = -1.0
+    buttons: int = 0 # Bitmask, see MASK_* in params
+    dial: int = DIAL_CENTER # -100 to 100
+
+class G29ButtonEvent(NamedTuple):
+    """Buttons that changed in the report that produced snapshot `seq`."""
+
+    seq: int
+    pressed: int # Bitmask of buttons that went down
+    released: int # Bitmask of buttons that came up
+
+BUTTON_EVENT_QUEUE_SIZE = 64 # Oldest events are dropped past this
+
+# gamepad, misc, plus, misc2, steering, accelerator, brake, clutch
+REPORT = struct.Struct("<BBBBHBBB")
 
 class G29:
     connected = False
-    cache = None
-    state_lock = threading.Lock()
-    state = {
-        "steering": 0.0,
-        "accelerator": -1.0,
-        "clutch": -1.0,
-        "brake": -1.0,
-        "buttons": {
-            "gamepad": {
-                "up": 0,
-                "down": 0,
-                "left": 0,
-                "right": 0,
-                "X": 0,
-                "O": 0,
-                "S": 0,
-                "T": 0
-            },
-            "misc": {
-                "R2": 0,
-                "R3": 0,
-                "L2": 0,
-                "L3": 0,
-                "Share": 0,
-                "Options": 0,
-            },
-            "+": 0,
-            "misc2": {
-                "-": 0,
-                "track": 0,
-                "dial": DIAL_CENTER, # -100 to 100
-                "PS": 0,
-            },
-        }
-    }
+    snapshot = G29Snapshot()
     dial_val = DIAL_CENTER
     LOGITECH_VID = 0x046D
     G29_PID = 0xC24F
 
     # Add dial
-    def __init__(self):
-        try:
-            #device = hid.Device(VENDOR_ID, PRODUCT_ID)
-            device = self.find_g29()
-        except:
-            raise Exception("Device not found. Is it plugged in?")
+    def __init__(self, device=None):
+        """`device` replaces the HID device (e.g. a MockG29Device), otherwise one is found with find_g29."""
+        if device is None:
+            try:
+                #device = hid.Device(VENDOR_ID, PRODUCT_ID)
+                device = self.find_g29()
+            except:
+                raise Exception("Device not found. Is it plugged in?")
         log.debug(f'Device manufacturer: {device.manufacturer}')
         log.debug(f'Product: {device.product}')
         self.device = device
         self.connected = True
 
+        # G29ButtonEvent for every report where a button changed. Bounded so it doesn't grow forever when nothing consumes it (e.g. calibration)
+        self.button_events = queue.Queue(maxsize=BUTTON_EVENT_QUEUE_SIZE)
+
     def find_g29(self):
+        if os.environ.get(MOCK_ENV, "0") not in ("", "0"):
+            print("Using simulated g29")
+            return MockG29Device()
+
+        if hid is None:
+            raise Exception("hidapi is not available")
+
         #print(hid.enumerate())
         devices = hid.enumerate()
 
@@ -267,10 +283,8 @@ class G29:
             return
 
         # only handle 12 byte msgs
-        byte_array = bytearray(dat)
-        if len(byte_array) >= 12:
-            self.update_state(byte_array)
-            self.cache = byte_array
+        if len(dat) >= 12:
+            self.update_state(dat)
         return dat
 
     def listen(self, timeout=10):
@@ -285,113 +299,95 @@ class G29:
         if self.pump_thread is not None:
             self.pump_thread.join()
 
-    def get_state(self):
+    def get_snapshot(self) -> G29Snapshot:
         if not self.connected:
             raise Exception("G29 not connected")
-        with self.state_lock:
-            return self.state.copy()
+        return self.snapshot
+
+    def get_state(self):
+        """Dict view of the latest snapshot, kept for callers of the original API."""
+        snapshot = self.get_snapshot()
+        buttons = snapshot.buttons
+
+        return {
+            "steering": snapshot.steering,
+            "accelerator": snapshot.accelerator,
+            "clutch": snapshot.clutch,
+            "brake": snapshot.brake,
+            "buttons": {
+                "gamepad": {
+                    "up": int(bool(buttons & MASK_UP)),
+                    "down": int(bool(buttons & MASK_DOWN)),
+                    "left": int(bool(buttons & MASK_LEFT)),
+                    "right": int(bool(buttons & MASK_RIGHT)),
+                    "X": int(bool(buttons & MASK_X)),
+                    "O": int(bool(buttons & MASK_CIRCLE)),
+                    "S": int(bool(buttons & MASK_SQUARE)),
+                    "T": int(bool(buttons & MASK_TRIANGLE))
+                },
+                "misc": {
+                    "R2": int(bool(buttons & MASK_R2)),
+                    "R3": int(bool(buttons & MASK_R3)),
+                    "L2": int(bool(buttons & MASK_L2)),
+                    "L3": int(bool(buttons & MASK_L3)),
+                    "Share": int(bool(buttons & MASK_SHARE)),
+                    "Options": int(bool(buttons & MASK_OPTIONS))
+                },
+                "+": int(bool(buttons & MASK_PLUS)),
+                "misc2": {
+                    "-": int(bool(buttons & MASK_MINUS)),
+                    "track": 0,
+                    "dial": snapshot.dial,
+                    "back": int(bool(buttons & MASK_BACK)),
+                    "PS": int(bool(buttons & MASK_PS))
+                }
+            }
+        }
 
     def update_state(self, byte_array):
-        with self.state_lock:
-            if self.cache is None:
-                log.warn("cache not available")
+        # Decode the whole report in one unpack, steering is a little endian uint16 across STEERING_COARSE/STEERING_FINE
+        gamepad, misc, plus, misc2, steering_raw, accelerator, brake, clutch = REPORT.unpack_from(byte_array)
+
+        buttons = misc << MASK_MISC_SHIFT | plus << MASK_PLUS_SHIFT | misc2 << MASK_MISC2_SHIFT | DPAD_HAT[gamepad & 0xF] | (gamepad >> 4) << MASK_FACE_SHIFT
+
+        # Only the pump thread writes, so the next snapshot can be built from the previous one and published with a single assignment
+        prev = self.snapshot
+        seq = prev.seq + 1
+        dial = prev.dial
+
+        changed = buttons ^ prev.buttons
+        if changed:
+            pressed = changed & buttons
+            released = changed & prev.buttons
+
+            if pressed & MASK_TRACK_RIGHT:
+                dial = self.update_dial(1)
+            if pressed & MASK_TRACK_LEFT:
+                dial = self.update_dial(-1)
+
+            self.put_button_event(G29ButtonEvent(seq, pressed, released))
+
+        self.snapshot = G29Snapshot(
+            seq,
+            steering_raw / 32767.5 - 1,
+            1 - accelerator / 127.5,
+            1 - brake / 127.5,
+            1 - clutch / 127.5,
+            buttons,
+            dial
+        )
+
+    def put_button_event(self, event):
+        # Only the pump thread puts, so after dropping the oldest event there is always room
+        while True:
+            try:
+                self.button_events.put_nowait(event)
                 return
-
-            # update only diffs
-            if byte_array[GAME_PAD] != self.cache[GAME_PAD]:
-                self.update_gamepad(byte_array[GAME_PAD])
-            if byte_array[BUTTON_MISC] != self.cache[BUTTON_MISC]:
-                self.update_misc(byte_array[BUTTON_MISC])
-            if byte_array[BUTTON_PLUS] != self.cache[BUTTON_PLUS]:
-                if byte_array[BUTTON_PLUS] == BUTTON_PLUS_ON:
-                    self.state["buttons"]["+"] = 1
-                else:
-                    self.state["buttons"]["+"] = 0
-            if byte_array[BUTTON_MISC2] != self.cache[BUTTON_MISC2]:
-                self.update_misc2(byte_array[BUTTON_MISC2])
-            if byte_array[STEERING_COARSE] != self.cache[STEERING_COARSE] or byte_array[STEERING_FINE] != self.cache[STEERING_FINE]:
-                steering_val = self.calc_steering(byte_array[STEERING_FINE], byte_array[STEERING_COARSE])
-                self.state["steering"] = steering_val
-            if byte_array[PEDAL_ACCELERATOR] != self.cache[PEDAL_ACCELERATOR]:
-                self.state["accelerator"] = self.calc_pedal(byte_array[PEDAL_ACCELERATOR])
-            if byte_array[PEDAL_BRAKE] != self.cache[PEDAL_BRAKE]:
-                self.state["brake"] = self.calc_pedal(byte_array[7])
-            if byte_array[PEDAL_CLUTCH] != self.cache[PEDAL_CLUTCH]:
-                self.state["clutch"] = self.calc_pedal(byte_array[8])
-
-    def calc_steering(self, coarse, fine):
-        # coarse 0-255
-        # fine 0-255
-        steering_raw = (coarse << 8) | fine  # 0-65535 for 16 bit integer
-        # scale to -1 to 1
-        steering_normalized = (steering_raw / 65535.0) * 2 - 1
-
-        return steering_normalized
-
-    def calc_pedal(self, val):
-        # input 255-0
-        normalized = (255 - val) / 255.0
-
-        # scale to -1 to 1
-        return normalized * 2 - 1
-
-    def update_gamepad(self, val):
-        if val == GAME_PAD_NIL:
-            print("reseting gamepad")
-            for k in self.state["buttons"]["gamepad"]:
-                self.state["buttons"]["gamepad"][k] = 0
-        if val == GAME_PAD_UP:
-            self.state["buttons"]["gamepad"]["up"] = 1
-        if val == GAME_PAD_DOWN:
-            self.state["buttons"]["gamepad"]["down"] = 1
-        if val == GAME_PAD_RIGHT:
-            self.state["buttons"]["gamepad"]["right"] = 1
-        if val == GAME_PAD_LEFT:
-            self.state["buttons"]["gamepad"]["left"] = 1
-        if val == GAME_PAD_X:
-            print("X")
-            self.state["buttons"]["gamepad"]["X"] = 1
-        if val == GAME_PAD_SQUARE:
-            self.state["buttons"]["gamepad"]["S"] = 1
-        if val == GAME_PAD_CIRCLE:
-            self.state["buttons"]["gamepad"]["O"] = 1
-        if val == GAME_PAD_TRIANGLE:
-            self.state["buttons"]["gamepad"]["T"] = 1
-
-    def update_misc(self, val):
-        if val == MISC_NIL:
-            for k in self.state["buttons"]["misc"]:
-                self.state["buttons"]["misc"][k] = 0
-        if val == MISC_R2:
-            self.state["buttons"]["misc"]["R2"] = 1
-        if val == MISC_R3:
-            self.state["buttons"]["misc"]["R3"] = 1
-        if val == MISC_L2:
-            self.state["buttons"]["misc"]["L2"] = 1
-        if val == MISC_L3:
-            self.state["buttons"]["misc"]["L3"] = 1
-        if val == MISC_SHARE:
-            self.state["buttons"]["misc"]["Share"] = 1
-        if val == MISC_OPTIONS:
-            self.state["buttons"]["misc"]["Options"] = 1
-
-    def update_misc2(self, val):
-        # handle nil case
-        if val == MISC2_NIL:
-            for k in self.state["buttons"]["misc2"]:
-                if k != "dial":
-                    self.state["buttons"]["misc2"][k] = 0
-        if val == MISC2_MINUS:
-            self.state["buttons"]["misc2"]["-"] = 1
-        if val == MISC2_TRACK_RIGHT:
-            self.state["buttons"]["misc2"]["dial"] = self.update_dial(1)
-        if val == MISC2_TRACK_LEFT:
-            self.state["buttons"]["misc2"]["dial"] = self.update_dial(-1)
-        if val == MISC2_BACK:
-            self.state["buttons"]["misc2"]["back"] = 1
-        if val == MISC_PSTATION:
-            print("ps")
-            self.state["buttons"]["misc2"]["PS"] = 1
+            except queue.Full:
+                try:
+                    self.button_events.get_nowait()
+                except queue.Empty:
+                    pass
 
     def update_dial(self, val):
         pos = self.dial_val + val
@@ -0,0 +1,95 @@
+import time
+import struct
+import threading
+
+# Report layout matches G29.update_state: gamepad, misc, plus, misc2, steering (uint16 LE), accelerator, brake, clutch
+REPORT = struct.Struct("<BBBBHBBB3x")
+
+class MockG29Device:
+    """
+    Simulated G29 HID device for running the steering loop without a wheel.
+    Models the rim as an inertia with viscous damping and Coulomb friction, driven by `force_constant` writes.
+    Steering is normalised (-1 to 1) like the real reports.
+    """
+
+    manufacturer = "Mock"
+    product = "Simulated G29 Driving Force Racing Wheel"
+
+    REPORT_HZ = 500 # Rate the real wheel sends reports at while it's moving
+    TORQUE_GAIN = 8.0 # Steering units / s^2 from a full force_constant offset (0 or 1)
+    DAMPING = 6.0 # 1 / s
+    FRICTION = 0.4 # Steering units / s^2 the motor has to overcome before the rim moves
+    STEP = 0.0005 # Seconds per physics step
+
+    def __init__(self, steering: float = 0.0, report_hz: float = REPORT_HZ) -> None:
+        self.steering = steering
+        self.velocity = 0.0
+
+        self.force = None # Last force_constant value (0-1), `None` when forces are off
+        self.driver_torque = 0.0 # Steering units / s^2 applied by a simulated driver's hands
+
+        self.report_period = 1 / report_hz
+        self.next_report = time.perf_counter()
+        self.sim_time = self.next_report
+
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        pass
+
+    def write(self, msg: bytes) -> int:
+        with self.lock:
+            self.writes += 1
+
+            if msg[0] == 0x11 and msg[1] == 0x00:
+                self.force = msg[2] / 255
+            elif msg[0] == 0xf3 or msg[0] <= 4:
+                self.force = None
+
+        return len(msg)
+
+    def step(self, dt: float) -> None:
+        # Forces above 0.5 turn the wheel towards negative steering
+        motor = 0.0 if self.force is None else (0.5 - self.force) * 2 * self.TORQUE_GAIN
+        drive = motor + self.driver_torque
+
+        if self.velocity == 0.0 and abs(drive) <= self.FRICTION:
+            return
+
+        friction = self.FRICTION if self.velocity > 0 or (self.velocity == 0.0 and drive > 0) else -self.FRICTION
+        velocity = self.velocity + (drive - friction - self.DAMPING * self.velocity) * dt
+
+        # Friction only brings the rim to rest, it never reverses it
+        if self.velocity != 0.0 and (velocity > 0) != (self.velocity > 0):
+            velocity = 0.0
+
+        self.velocity = velocity
+        self.steering += velocity * dt
+
+        if abs(self.steering) > 1.0:
+            self.steering = max(-1.0, min(1.0, self.steering))
+            self.velocity = 0.0
+
+    def advance(self, now: float) -> None:
+        with self.lock:
+            while self.sim_time + self.STEP <= now:
+                self.step(self.STEP)
+                self.sim_time += self.STEP
+
+    def get_report(self) -> bytes:
+        raw = round((self.steering + 1) * 32767.5)
+        return REPORT.pack(8, 0, 0, 0, max(0, min(65535, raw)), 255, 255, 255)
+
+    def read(self, size: int, timeout: int = None) -> bytes:
+        """Blocks until the next report is due, like the real device does."""
+
+        delay = self.next_report - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        now = time.perf_counter()
+        self.next_report = max(self.next_report + self.report_period, now)
+
+        self.advance(now)
+        return self.get_report()[:size]
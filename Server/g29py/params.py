@@ -58,3 +58,43 @@ MISC_PSTATION = 16
 # Dial
 DIAL_RANGE = 200
 DIAL_CENTER = 0
+
+# BUTTON MASK
+# Bit layout of G29Snapshot.buttons: misc byte (0-7), plus byte (8-15), misc2 byte (16-23), d-pad (24-27), face buttons (28-31)
+MASK_MISC_SHIFT = 0
+MASK_PLUS_SHIFT = 8
+MASK_MISC2_SHIFT = 16
+MASK_DPAD_SHIFT = 24
+MASK_FACE_SHIFT = 28
+
+MASK_R2 = MISC_R2 << MASK_MISC_SHIFT
+MASK_R3 = MISC_R3 << MASK_MISC_SHIFT
+MASK_L2 = MISC_L2 << MASK_MISC_SHIFT
+MASK_L3 = MISC_L3 << MASK_MISC_SHIFT
+MASK_SHARE = MISC_SHARE << MASK_MISC_SHIFT
+MASK_OPTIONS = MISC_OPTIONS << MASK_MISC_SHIFT
+
+MASK_PLUS = BUTTON_PLUS_ON << MASK_PLUS_SHIFT
+
+MASK_MINUS = MISC2_MINUS << MASK_MISC2_SHIFT
+MASK_TRACK_RIGHT = MISC2_TRACK_RIGHT << MASK_MISC2_SHIFT
+MASK_TRACK_LEFT = MISC2_TRACK_LEFT << MASK_MISC2_SHIFT
+MASK_BACK = MISC2_BACK << MASK_MISC2_SHIFT
+MASK_PS = MISC_PSTATION << MASK_MISC2_SHIFT
+
+MASK_UP = 1 << MASK_DPAD_SHIFT
+MASK_RIGHT = 2 << MASK_DPAD_SHIFT
+MASK_DOWN = 4 << MASK_DPAD_SHIFT
+MASK_LEFT = 8 << MASK_DPAD_SHIFT
+
+MASK_X = (GAME_PAD_X >> 4 & 0xF) << MASK_FACE_SHIFT
+MASK_SQUARE = (GAME_PAD_SQUARE >> 4 & 0xF) << MASK_FACE_SHIFT
+MASK_CIRCLE = (GAME_PAD_CIRCLE >> 4 & 0xF) << MASK_FACE_SHIFT
+MASK_TRIANGLE = (GAME_PAD_TRIANGLE >> 4 & 0xF) << MASK_FACE_SHIFT
+
+# The d-pad is a hat switch in the low nibble of the game pad byte (0 = up, clockwise in eighths, 8 = released)
+DPAD_HAT = (
+    MASK_UP, MASK_UP | MASK_RIGHT, MASK_RIGHT, MASK_RIGHT | MASK_DOWN,
+    MASK_DOWN, MASK_DOWN | MASK_LEFT, MASK_LEFT, MASK_LEFT | MASK_UP,
+    0, 0, 0, 0, 0, 0, 0, 0
+)
@@ -0,0 +1,138 @@
+import os
+
+from lxml import etree
+
+STREAM_TAG = b"X35" # First field of every state line, lines from other formats are skipped
+
+# Field order of a state line, matches formatStateLine in the mod. Booleans are written as 1/0
+STATE_FIELDS = ("seq", "vx", "vy", "vz", "vry", "tx", "ty", "tz", "try", "toolOn", "toolLowered", "workWidth", "workOffset")
+IMPLEMENT_FIELDS = ("id", "tx", "ty", "tz", "try", "width", "offset", "on", "lowered")
+BOOL_FIELDS = {"toolOn", "toolLowered", "on", "lowered"}
+
+def parse_value(text: str | None) -> any:
+    text = text.strip() if text else ""
+    if text.lower() == "true":
+        return True
+    elif text.lower() == "false":
+        return False
+    elif text.lower() == "nil":
+        return None
+
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def parse_state_xml(raw_xml: bytes) -> dict[str, any]:
+    root = etree.fromstring(raw_xml)
+
+    data = {}
+    for child in root:
+        # Implement records are stored as attributes: <implements><implement id="" tx="" .../></implements>
+        if child.tag == "implements":
+            data["implements"] = [{key: parse_value(value) for key, value in implement.attrib.items()} for implement in child]
+            continue
+
+        data[child.tag] = parse_value(child.text)
+
+    return data
+
+def parse_fields(names: tuple[str, ...], values: list[bytes]) -> dict[str, any]:
+    return {name: value != b"0" if name in BOOL_FIELDS else float(value) for name, value in zip(names, values)}
+
+def parse_state_line(line: bytes) -> dict[str, any]:
+    """
+    Parses one line of the mod's stream export:
+        X35 <state fields> <implement count> <implement fields>...
+    Raises ValueError if the line is malformed.
+    """
+
+    values = line.split()
+    if len(values) == 0 or values[0] != STREAM_TAG:
+        raise ValueError(f"Not a state line: {line!r}")
+
+    state_end = 1 + len(STATE_FIELDS)
+    if len(values) < state_end + 1:
+        raise ValueError(f"State line is too short: {line!r}")
+
+    data = parse_fields(STATE_FIELDS, values[1:state_end])
+
+    count = int(values[state_end])
+    if len(values) != state_end + 1 + count * len(IMPLEMENT_FIELDS):
+        raise ValueError(f"State line has the wrong number of implement fields: {line!r}")
+
+    start = state_end + 1
+    data["implements"] = [parse_fields(IMPLEMENT_FIELDS, values[start + i * len(IMPLEMENT_FIELDS):start + (i + 1) * len(IMPLEMENT_FIELDS)]) for i in range(count)]
+
+    return data
+
+class StreamTailer:
+    """
+    Follows a file the mod appends lines to, reading only the bytes added since the last call.
+    Handles the file being replaced (new inode) or truncated (the mod starts it over once it gets too big).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self.partial = b"" # Bytes after the last newline, the rest of the line hasn't been written yet
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self.partial = b""
+
+    def open(self) -> bool:
+        self.close()
+
+        try:
+            self.file = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        return True
+
+    def read_new(self) -> bytes:
+        chunk = self.file.read()
+        self.offset += len(chunk)
+        return chunk
+
+    def read_lines(self) -> list[bytes]:
+        """Returns: every complete line written since the last call, oldest first."""
+
+        if self.file is None and not self.open():
+            return []
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        old_lines = []
+
+        if stat.st_ino != self.inode:
+            # Replaced: finish the lines written to the old file, then start the new one from the beginning
+            print("State stream replaced. Reopening...")
+            old_lines = (self.partial + self.read_new()).split(b"\n")[:-1]
+            if not self.open():
+                return old_lines
+        elif stat.st_size < self.offset:
+            # Truncated: the mod started the file over
+            self.file.seek(0)
+            self.offset = 0
+            self.partial = b""
+        elif stat.st_size == self.offset:
+            return []
+
+        lines = (self.partial + self.read_new()).split(b"\n")
+        self.partial = lines.pop()
+
+        return old_lines + lines
@@ -2,9 +2,14 @@ import time
 import json
 import socket
 import os
+import sys
 from tkinter import messagebox
 from lxml import etree
 
+from ingest import parse_state_xml, parse_state_line, StreamTailer
+from telemetry import TelemetryRecorder, ReplaySource
+from metrics import METRICS, start_metrics_server, get_send_queue_bytes
+
 from traceback import print_exc
 from copy import deepcopy
 from threading import Thread
@@ -15,77 +20,146 @@ except Exception as e:
     print(f"Failed to initialize G29 support!")
 
 class DataManager:
+    POLL_INTERVAL = 0.005 # Seconds between checks of state.xml for a new save
+    INGEST_MODES = ("xml", "stream", "replay")
+
     def __init__(self) -> None:
         self.settings = json.loads(open("settings.json", 'r').read())
 
         self.log_path = self.settings["log_path"]
         self.gps_keyword = "TopconX35"
+        self.poll_interval = float(self.settings.get("ingest_poll_interval", self.POLL_INTERVAL))
+
+        # "xml" watches the state.xml the mod saves, "stream" tails the state.log it appends to when streamExport is on in its config.xml
+        self.ingest_mode = self.settings.get("ingest_mode", "xml")
+        self.stream_path = self.settings.get("stream_path", os.path.join(os.path.dirname(self.log_path), "state.log"))
+
+        # "replay" plays a recorded telemetry session back instead of reading the game
+        self.replay_path = self.settings.get("replay_path", None)
+        self.replay_speed = float(self.settings.get("replay_speed", 1.0))
+
+        # Every sample the server publishes can be recorded to a session file for replaying later
+        self.recorder = None
+        if self.settings.get("telemetry_record", False) and self.ingest_mode != "replay":
+            self.recorder = TelemetryRecorder.create_session(self.settings.get("telemetry_dir", "telemetry"))
+            print(f"Recording telemetry to {self.recorder.path}.")
 
         self.curr_data = '{}'
 
+        self.last_stat = None # (mtime, size) of the last state.xml that parsed
+        self.last_seq = None
+
+    def publish(self, data: dict[str, any]) -> None:
+        # Saves that are only heartbeats carry the same sequence number
+        seq = data.get("seq")
+        if seq is not None and seq == self.last_seq:
+            return
+
+        self.last_seq = seq
+        self.curr_data = json.dumps(data)
+        METRICS.inc("samples_published_total")
+
+        if self.recorder is not None:
+            self.recorder.write(data)
+
     def run(self) -> None:
-        print("Watching log.txt for GPS updates...\n")
+        if self.ingest_mode not in self.INGEST_MODES:
+            print(f"Unknown ingest mode: {self.ingest_mode}! Using xml.")
+            self.ingest_mode = "xml"
 
-        last_inode = None
+        if self.ingest_mode == "stream":
+            self.run_stream()
+        elif self.ingest_mode == "replay":
+            self.run_replay()
+        else:
+            self.run_xml()
+
+    def run_xml(self) -> None:
+        print("Watching state.xml for GPS updates...\n")
 
         while True:
-            #print("Rerunning watchdog...")
+            try:
+                stat = os.stat(self.log_path)
+            except FileNotFoundError:
+                time.sleep(1)
+                continue
 
-            with open(self.log_path, "r") as file:
+            # The mod only saves when something changed, so there is nothing to read until the file does
+            file_stat = (stat.st_mtime_ns, stat.st_size)
+            if file_stat == self.last_stat:
+                time.sleep(self.poll_interval)
+                continue
+
+            start = time.perf_counter()
+            with open(self.log_path, "rb") as file:
                 raw_xml = file.read()
-                if raw_xml == "": continue
-                root = etree.fromstring(raw_xml)
-
-                data = {}
-                for child in root:
-                    text = child.text.strip() if child.text else ""
-                    if text.lower() == "true":
-                        value = True
-                    elif text.lower() == "false":
-                        value = False
-                    elif text.lower() == "nil":
-                        value = None
-                    else:
-                        try:
-                            value = float(text)
-                        except ValueError:
-                            value = text
-
-                    data[child.tag] = value
-
-                self.curr_data = json.dumps(data)
 
+            try:
+                data = parse_state_xml(raw_xml)
+            except etree.XMLSyntaxError:
+                # Read the file part way through the game rewriting it, the next poll will see the finished save
+                METRICS.inc("torn_reads_total")
+                time.sleep(self.poll_interval)
+                continue
+
+            METRICS.observe("parse_latency_seconds", time.perf_counter() - start)
+            METRICS.inc("samples_parsed_total")
+
+            self.last_stat = file_stat
+            self.publish(data)
+
+    def run_stream(self) -> None:
+        print("Tailing state.log for GPS updates...\n")
+
+        tailer = StreamTailer(self.stream_path)
+
+        while True:
+            lines = tailer.read_lines()
+
+            if tailer.file is None:
+                time.sleep(1)
                 continue
 
-                file.seek(0, 2)  # Go to the end of the file
-                last_inode = os.fstat(file.fileno()).st_ino
+            # Only the newest state matters, older lines that arrived in the same read are skipped
+            for line in reversed(lines):
+                start = time.perf_counter()
+                try:
+                    data = parse_state_line(line)
+                except ValueError:
+                    continue
 
-                for i in range(100):
-                    # Check if file was rotated or replaced
-                    current_inode = os.stat(self.log_path).st_ino
-                    if current_inode != last_inode:
-                        print("Log file rotated/replaced. Reopening...")
-                        break  # Exit inner loop and reopen
+                METRICS.observe("parse_latency_seconds", time.perf_counter() - start)
+                METRICS.inc("samples_parsed_total")
 
-                    line = file.readline()
+                self.publish(data)
+                break
+            else:
+                time.sleep(self.poll_interval)
 
-                    if not line:
-                        file.seek(0, 1)  # HACK: force buffer refresh
-                        time.sleep(0.1)
-                        continue
+    def run_replay(self) -> None:
+        if self.replay_path is None:
+            raise Exception("Ingest mode is replay but no replay_path is set!")
 
-                    if self.gps_keyword in line:
-                        data = "{" + line.split("{", 1)[1].replace("'", '"').replace("nil", "null")
-                        self.curr_data = data
+        # One source (and memory map) is reused for every loop
+        source = ReplaySource(self.replay_path, self.replay_speed)
+        if len(source.reader) == 0:
+            raise Exception(f"Replay {self.replay_path} has no records!")
 
-            #except Exception as e:
-            #    print(f"{e}! Continuing...")
-            #    time.sleep(1)  # Avoid spamming errors
+        print(f"Replaying {self.replay_path} at {self.replay_speed}x...\n")
+
+        while True:
+            # Replays loop so the tablet always has data, sequence numbers restart with each loop
+            self.last_seq = None
+            source.run(self.publish)
+
+    def close(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
 class Server:
     HOST = '0.0.0.0'
     PORT = 5060
-    BASE_WHEEL_SPEED = 0.4
 
     def __init__(self) -> None:
         self.wheel_disconnect = False
@@ -96,6 +170,7 @@ class Server:
         self.enable_working_width_override = False
         
         self.settings = {}
+        self.client = None # Metrics labels of the connected tablet
 
         self.load_settings()
 
@@ -114,7 +189,6 @@ class Server:
             self.working_width_override = self.settings["working_width_override"]
             self.enable_working_width_override = self.settings["working_width_override"]
             self.wheel_supported = self.settings["allow_autosteer"]
-            self.BASE_WHEEL_SPEED = float(self.settings.get("base_wheel_speed", 0.4))
 
         except Exception as e:
             print(f"Error while loading settings.json! Error: {e}.")
@@ -124,20 +198,43 @@ class Server:
         while 1:
             messagebox.showinfo("TopconX35 - Server running!", "Server running! Close console to close.")
 
-    def run(self, data_manager) -> None:
-        Thread(target=self.run_ui, daemon=True).start()
-        Thread(target=data_manager.run, daemon=True).start()
+    def init_wheel(self) -> object | None:
+        """Returns: the wheel, or `None` if it couldn't be opened. Only one is made per process, it's handed to every `run`."""
 
         try:
             wheel = Wheel(self.settings, self.on_wheel_disconnect, self.on_connect_pressed)
-            self.wheel_supported = True
             print("Wheel support enabled.")
+            return wheel
 
         except Exception as e:
             print(f"Error while initializing G29 support! Error: {e}! Autosteer will no longer be available because of this.")
             import traceback
             traceback.print_exc()
 
+        return None
+
+    def run(self, data_manager, wheel: object | None = None) -> None:
+        Thread(target=self.run_ui, daemon=True).start()
+
+        self.wheel_supported = wheel is not None
+        if wheel is not None:
+            # The wheel outlives each server, so its callbacks are pointed at this one
+            wheel.on_wheel_disconnect = self.on_wheel_disconnect
+            wheel.on_connect_pressed = self.on_connect_pressed
+
+        try:
+            self.serve(data_manager, wheel)
+        finally:
+            # Nothing steers while the tablet is gone, the actuator lets go of the wheel until the next target
+            if wheel is not None:
+                wheel.release()
+
+            # A client that's gone has nothing queued, its series would otherwise keep reporting the last value
+            if self.client is not None:
+                METRICS.remove("send_queue_bytes", labels=self.client)
+            METRICS.set("client_connected", 0)
+
+    def serve(self, data_manager, wheel: object | None) -> None:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
@@ -151,6 +248,11 @@ class Server:
             conn, addr = s.accept()
             with conn:
                 print(f"Connected by {addr}")
+
+                client = self.client = {"client": addr[0]}
+                METRICS.inc("client_connections_total")
+                METRICS.set("client_connected", 1)
+
                 while True:
                     try:
                         data = conn.recv(1024)
@@ -171,9 +273,6 @@ class Server:
                     try:
                         data = json.loads(data.decode())
 
-                        if self.wheel_supported:
-                            wheel.update()
-
                         if data.get("recieved_wheel_connect"):
                             self.send_wheel_connect = False
                     
@@ -183,20 +282,16 @@ class Server:
 
                             if desired_rotation is not None:
                                 desired_rotation = min(0.9, max(-0.9, desired_rotation))
-                                wheel.target_steer = desired_rotation
-
-                                if not wheel.is_rotating:
-                                    Thread(target=lambda: wheel.rotate_to(self.BASE_WHEEL_SPEED), daemon=True).start()
+                                wheel.set_target(desired_rotation)
 
                         if self.wheel_supported:
                             if data.get("autosteer_status", False):
                                 send_data["wheel_disconnect"] = self.wheel_disconnect
                                 self.wheel_disconnect = False
                             else:
-                                if wheel.is_rotating:
-                                    wheel._stop_autorotate = True
+                                wheel.release()
                             
-                            send_data["desired_wheel_rotation"] = wheel.get_state()["steering"]
+                            send_data["desired_wheel_rotation"] = wheel.get_snapshot().steering
 
                     except Exception as e:
                         print(f"Error: {e}!")
@@ -213,11 +308,46 @@ class Server:
 
                     conn.sendall(json.dumps(send_data).encode())
 
+                    METRICS.inc("frames_sent_total", labels=client)
+                    send_queue = get_send_queue_bytes(conn)
+                    if send_queue is not None:
+                        METRICS.set("send_queue_bytes", send_queue, labels=client)
+
 def run() -> None:
-    while 1:
-        data_manager = DataManager()
-        Server().run(data_manager)
-        print("restarting...")
+    settings = json.loads(open("settings.json", 'r').read())
+
+    # Counters and gauges for curl or a local Prometheus, a port of 0 turns it off
+    metrics_port = int(settings.get("metrics_port", 9105))
+    if metrics_port != 0:
+        try:
+            start_metrics_server(metrics_port)
+        except OSError as e:
+            print(f"Failed to start the metrics server on port {metrics_port}! Error: {e}.")
+
+    # Ingest outlives each server, its thread never stops so a new one per restart would record and count every sample again
+    data_manager = DataManager()
+    Thread(target=data_manager.run, daemon=True).start()
+
+    wheel = None
+
+    try:
+        while 1:
+            server = Server()
+
+            # A second `Wheel` on the same device would run its own actuator loop against the first
+            if wheel is None:
+                wheel = server.init_wheel()
+
+            server.run(data_manager, wheel)
+
+            METRICS.inc("server_restarts_total")
+            print("restarting...")
+    finally:
+        data_manager.close()
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    if "--calibrate" in sys.argv:
+        from calibration import run_calibration
+        run_calibration()
+    else:
+        run()
\ No newline at end of file
@@ -0,0 +1,211 @@
+import json
+import time
+import struct
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+try:
+    from fcntl import ioctl
+    from termios import TIOCOUTQ
+except ImportError:
+    ioctl = None # Windows has no way to ask for a socket's send queue
+
+class Metrics:
+    """
+    Counters, gauges and summaries shared by the server's threads.
+    Counters that have a rate registered also get a per second gauge, updated every `RATE_INTERVAL` seconds.
+    """
+
+    RATE_INTERVAL = 1.0
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.start_time = time.time()
+
+        self.types = {} # name: "counter" | "gauge" | "summary"
+        self.help = {}
+        self.values = {} # name: {labels: value}, labels as a sorted tuple of (key, value)
+
+        self.rates = {} # counter name: rate gauge name
+        self.last_rate_values = {} # counter name: {labels: value at the last rate update}
+        self.rate_thread = None
+
+    def describe(self, name: str, metric_type: str, help_text: str) -> None:
+        with self.lock:
+            self.types[name] = metric_type
+            self.help[name] = help_text
+            self.values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1, labels: dict[str, str] | None = None) -> None:
+        key = tuple(sorted(labels.items())) if labels else ()
+
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: dict[str, str] | None = None) -> None:
+        key = tuple(sorted(labels.items())) if labels else ()
+
+        with self.lock:
+            self.values.setdefault(name, {})[key] = value
+
+    def remove(self, name: str, labels: dict[str, str] | None = None) -> None:
+        key = tuple(sorted(labels.items())) if labels else ()
+
+        with self.lock:
+            self.values.get(name, {}).pop(key, None)
+
+    def observe(self, name: str, value: float) -> None:
+        """Adds a sample to a summary, exported as `_sum`, `_count` and `_max`."""
+
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            count, total, peak = series.get((), (0, 0.0, 0.0))
+            series[()] = (count + 1, total + value, max(peak, value))
+
+    def add_rate(self, counter: str, gauge: str, help_text: str) -> None:
+        self.describe(gauge, "gauge", help_text)
+
+        with self.lock:
+            self.rates[counter] = gauge
+
+    def update_rates(self) -> None:
+        with self.lock:
+            for counter, gauge in self.rates.items():
+                last = self.last_rate_values.setdefault(counter, {})
+                rates = self.values.setdefault(gauge, {})
+
+                for key, value in self.values.get(counter, {}).items():
+                    rates[key] = (value - last.get(key, 0)) / self.RATE_INTERVAL
+                    last[key] = value
+
+    def run_rates(self) -> None:
+        next_update = time.perf_counter()
+
+        while True:
+            next_update += self.RATE_INTERVAL
+            time.sleep(max(0.0, next_update - time.perf_counter()))
+
+            self.update_rates()
+
+    def start_rates(self) -> None:
+        if self.rate_thread is not None: return
+
+        self.rate_thread = Thread(target=self.run_rates, daemon=True)
+        self.rate_thread.start()
+
+    def format_labels(self, key: tuple[tuple[str, str], ...]) -> str:
+        if len(key) == 0: return ""
+
+        labels = ",".join(f'{name}="{str(value)}"' for name, value in key)
+        return "{" + labels + "}"
+
+    def render_prometheus(self) -> str:
+        lines = []
+
+        with self.lock:
+            self.values["uptime_seconds"] = {(): time.time() - self.start_time}
+
+            for name in sorted(self.values):
+                metric_type = self.types.get(name, "gauge")
+
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+                for key, value in self.values[name].items():
+                    if metric_type == "summary":
+                        count, total, peak = value
+                        lines.append(f"{name}_sum {total}")
+                        lines.append(f"{name}_count {count}")
+                        lines.append(f"# TYPE {name}_max gauge") # Summaries have no max of their own
+                        lines.append(f"{name}_max {peak}")
+                    else:
+                        lines.append(f"{name}{self.format_labels(key)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict[str, any]:
+        data = {}
+
+        with self.lock:
+            self.values["uptime_seconds"] = {(): time.time() - self.start_time}
+
+            for name, series in self.values.items():
+                for key, value in series.items():
+                    full_name = name + self.format_labels(key)
+
+                    if self.types.get(name) == "summary":
+                        count, total, peak = value
+                        data[full_name] = {"count": count, "sum": total, "max": peak, "avg": total / count if count > 0 else 0.0}
+                    else:
+                        data[full_name] = value
+
+        return data
+
+# Shared by every module in the server process
+METRICS = Metrics()
+
+METRICS.describe("samples_parsed_total", "counter", "State samples parsed from the game.")
+METRICS.describe("samples_published_total", "counter", "Parsed samples with a new sequence number, made available to the tablet.")
+METRICS.describe("torn_reads_total", "counter", "state.xml reads that caught the game part way through a save.")
+METRICS.describe("parse_latency_seconds", "summary", "Time to read and parse one state sample.")
+METRICS.describe("frames_sent_total", "counter", "Packets sent to each tablet client.")
+METRICS.describe("send_queue_bytes", "gauge", "Bytes sent to the tablet that are still in the socket's send queue (Linux only).")
+METRICS.describe("client_connections_total", "counter", "Tablet connections accepted, more than one means the tablet reconnected.")
+METRICS.describe("client_connected", "gauge", "1 while a tablet is connected.")
+METRICS.describe("server_restarts_total", "counter", "Times the server restarted after losing its client.")
+METRICS.describe("wheel_loop_iterations_total", "counter", "Steering actuator loop iterations.")
+METRICS.describe("hid_writes_total", "counter", "Force commands written to the wheel.")
+METRICS.describe("wheel_disconnects_total", "counter", "Times the driver took the wheel from autosteer.")
+
+METRICS.add_rate("samples_parsed_total", "samples_parsed_per_second", "Samples parsed over the last second.")
+METRICS.add_rate("wheel_loop_iterations_total", "wheel_loop_hz", "Steering actuator loop iterations over the last second.")
+METRICS.add_rate("hid_writes_total", "hid_writes_per_second", "Force commands written to the wheel over the last second.")
+METRICS.add_rate("frames_sent_total", "frames_sent_per_second", "Packets sent to each tablet client over the last second.")
+
+def get_send_queue_bytes(conn: object) -> int | None:
+    """Returns: bytes written to `conn` that the peer hasn't acknowledged yet, `None` where the OS can't tell us."""
+
+    if ioctl is None: return None
+
+    try:
+        return struct.unpack("i", ioctl(conn.fileno(), TIOCOUTQ, b"\0\0\0\0"))[0]
+    except OSError:
+        return None
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics for Prometheus text format, GET /metrics.json (or /) for JSON."""
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            body = METRICS.render_prometheus().encode()
+            content_type = "text/plain; version=0.0.4"
+        elif self.path in ("/", "/metrics.json"):
+            body = json.dumps(METRICS.to_dict()).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: any) -> None:
+        pass # Scrapes would flood the console
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves the metrics on localhost in the background."""
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+
+    Thread(target=server.serve_forever, daemon=True).start()
+    METRICS.start_rates()
+
+    print(f"Metrics available at http://{host}:{port}/metrics.")
+    return server
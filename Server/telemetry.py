@@ -0,0 +1,235 @@
+import os
+import mmap
+import time
+import struct
+import argparse
+
+from typing import Callable, Iterator
+
+# Session file: a header then fixed size records, so a session can be appended to while it's read and indexed straight out of a memory map
+MAGIC = b"X35T"
+VERSION = 1
+MAX_IMPLEMENTS = 4 # Implements past this are dropped from the record
+
+HEADER = struct.Struct("<4sHHd") # magic, version, max implements, wall clock start time
+
+STATE_FLOATS = ("vx", "vy", "vz", "vry", "tx", "ty", "tz", "try", "workWidth", "workOffset")
+IMPLEMENT_FLOATS = ("tx", "ty", "tz", "try", "width", "offset")
+
+STATE_FORMAT = "dI" + "f" * len(STATE_FLOATS) + "BB" # seconds since the session started, seq, floats, flags, implement count
+IMPLEMENT_FORMAT = "I" + "f" * len(IMPLEMENT_FLOATS) + "B" # id, floats, flags
+
+RECORD = struct.Struct("<" + STATE_FORMAT + IMPLEMENT_FORMAT * MAX_IMPLEMENTS)
+IMPLEMENT_SIZE = len(IMPLEMENT_FLOATS) + 2
+STATE_SIZE = len(STATE_FLOATS) + 4
+
+EMPTY_IMPLEMENT = (0,) + (0.0,) * len(IMPLEMENT_FLOATS) + (0,)
+
+def get_flags(first: bool, second: bool) -> int:
+    return (1 if first else 0) | (2 if second else 0)
+
+def pack_sample(t: float, data: dict[str, any]) -> bytes:
+    implements = (data.get("implements") or [])[:MAX_IMPLEMENTS]
+
+    values = [t, int(data.get("seq") or 0)]
+    values.extend(float(data.get(key) or 0.0) for key in STATE_FLOATS)
+    values.append(get_flags(data.get("toolOn", False), data.get("toolLowered", True)))
+    values.append(len(implements))
+
+    for record in implements:
+        values.append(int(record.get("id") or 0))
+        values.extend(float(record.get(key) or 0.0) for key in IMPLEMENT_FLOATS)
+        values.append(get_flags(record.get("on", False), record.get("lowered", True)))
+
+    for _ in range(MAX_IMPLEMENTS - len(implements)):
+        values.extend(EMPTY_IMPLEMENT)
+
+    return RECORD.pack(*values)
+
+def unpack_sample(buffer: bytes, offset: int = 0) -> tuple[float, dict[str, any]]:
+    """Returns: (seconds since the session started, sample in the same layout the ingest parsers produce)."""
+
+    values = RECORD.unpack_from(buffer, offset)
+
+    t = values[0]
+    data = {"seq": float(values[1])}
+    data.update(zip(STATE_FLOATS, values[2:2 + len(STATE_FLOATS)]))
+
+    flags, count = values[STATE_SIZE - 2], values[STATE_SIZE - 1]
+    data["toolOn"] = bool(flags & 1)
+    data["toolLowered"] = bool(flags & 2)
+
+    implements = []
+    for i in range(count):
+        start = STATE_SIZE + i * IMPLEMENT_SIZE
+        record = {"id": float(values[start])}
+        record.update(zip(IMPLEMENT_FLOATS, values[start + 1:start + 1 + len(IMPLEMENT_FLOATS)]))
+        record["on"] = bool(values[start + IMPLEMENT_SIZE - 1] & 1)
+        record["lowered"] = bool(values[start + IMPLEMENT_SIZE - 1] & 2)
+
+        implements.append(record)
+
+    data["implements"] = implements
+    return t, data
+
+class TelemetryRecorder:
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.start = time.perf_counter()
+
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, MAX_IMPLEMENTS, time.time()))
+        self.file.flush()
+
+        self.records = 0
+
+    @staticmethod
+    def create_session(directory: str) -> "TelemetryRecorder":
+        name = time.strftime("session_%Y%m%d_%H%M%S")
+        path = os.path.join(directory, f"{name}.x35t")
+
+        # Sessions can start within the same second of each other
+        i = 1
+        while os.path.exists(path):
+            path = os.path.join(directory, f"{name}_{i}.x35t")
+            i += 1
+
+        return TelemetryRecorder(path)
+
+    def write(self, data: dict[str, any]) -> None:
+        self.file.write(pack_sample(time.perf_counter() - self.start, data))
+        self.file.flush() # Keeps the session readable while it's being recorded
+
+        self.records += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+class TelemetryReader:
+    """Random access to the records of a session file through a memory map."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < HEADER.size:
+                raise Exception(f"{path} is too short to be a telemetry session!")
+
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, max_implements, self.started = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or max_implements != MAX_IMPLEMENTS:
+            self.map.close()
+            raise Exception(f"{path} isn't a version {VERSION} telemetry session!")
+
+        # A record that was still being written when the session ended is ignored
+        self.count = (size - HEADER.size) // RECORD.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> tuple[float, dict[str, any]]:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+
+        return unpack_sample(self.map, HEADER.size + index * RECORD.size)
+
+    def __iter__(self) -> Iterator[tuple[float, dict[str, any]]]:
+        for i in range(self.count):
+            yield self[i]
+
+    def get_duration(self) -> float:
+        return self[-1][0] - self[0][0] if self.count > 0 else 0.0
+
+    def close(self) -> None:
+        self.map.close()
+
+class ReplaySource:
+    """
+    Plays a session back with its original timing divided by `speed`.
+    A speed of 0 plays it back as fast as possible.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0) -> None:
+        self.reader = TelemetryReader(path)
+        self.speed = speed
+
+    def __iter__(self) -> Iterator[dict[str, any]]:
+        if len(self.reader) == 0:
+            return
+
+        first = self.reader[0][0]
+        start = time.perf_counter()
+
+        for t, data in self.reader:
+            if self.speed > 0:
+                delay = start + (t - first) / self.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            yield data
+
+    def run(self, on_sample: Callable[[dict[str, any]], None]) -> int:
+        """Returns: number of samples played."""
+
+        played = 0
+        for data in self:
+            on_sample(data)
+            played += 1
+
+        return played
+
+    def feed_client(self, client: any) -> int:
+        """Drives a Tablet `Client` in place of its socket thread."""
+
+        def on_sample(data: dict[str, any]) -> None:
+            client.connected = True
+            client.data = data
+
+            if client.on_data is not None:
+                client.on_data(data)
+
+        return self.run(on_sample)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or replay a recorded telemetry session.")
+    parser.add_argument("command", choices=("info", "dump", "replay"))
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor, 0 replays as fast as possible")
+    parser.add_argument("--limit", type=int, default=None, help="Most records to dump")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        reader = TelemetryReader(args.path)
+        duration = reader.get_duration()
+
+        print(f"{args.path}: {len(reader)} records over {duration:.1f}s ({len(reader) / duration if duration > 0 else 0:.1f} Hz), recorded {time.ctime(reader.started)}")
+        reader.close()
+
+    elif args.command == "dump":
+        reader = TelemetryReader(args.path)
+
+        for i, (t, data) in enumerate(reader):
+            if args.limit is not None and i >= args.limit:
+                break
+
+            print(f"{t:10.4f} {data}")
+
+        reader.close()
+
+    else:
+        start = time.perf_counter()
+        played = ReplaySource(args.path, args.speed).run(lambda data: None)
+        elapsed = time.perf_counter() - start
+
+        print(f"Replayed {played} records in {elapsed:.2f}s ({played / elapsed if elapsed > 0 else 0:.0f} records/s).")
+
+if __name__ == "__main__":
+    main()
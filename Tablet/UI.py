@@ -725,6 +725,9 @@ class BottomBox:
     width = 400
     height = 100
 
+    PIECE_ROW_HEIGHT = 25
+    PIECE_FONT_SIZE = 20
+
     bg_color = pr.DARKGRAY
 
     def __init__(self, paddock_manager: PaddockManager) -> None:
@@ -737,7 +740,17 @@ class BottomBox:
         self.y = self.screen_height - self.height
 
     def update(self) -> None:
-        pr.draw_rectangle(self.x, self.y, self.width, self.height, self.bg_color)
+        paddock = self.paddock_manager.active_paddock
+        piece_stats = paddock.get_piece_stats()
+
+        # Grows upwards with a row for each piece
+        height = self.height + len(piece_stats) * self.PIECE_ROW_HEIGHT
+        y = self.screen_height - height
+
+        pr.draw_rectangle(self.x, y, self.width, height, self.bg_color)
+
+        for i, (name, worked_ha, total_ha) in enumerate(piece_stats):
+            pr.draw_text(f"{name}: {worked_ha:.2f} / {total_ha:.2f} Ha", self.x + 5, y + 5 + i * self.PIECE_ROW_HEIGHT, self.PIECE_FONT_SIZE, pr.LIGHTGRAY)
 
-        pr.draw_text(f"Worked Ha: {self.paddock_manager.active_paddock.worked_ha:.2f}", self.x + 5, self.y + 5, 30, pr.WHITE)
-        pr.draw_text(f"Remain Ha: {max(0, self.paddock_manager.active_paddock.ha - self.paddock_manager.active_paddock.worked_ha):.2f}", self.x + 5, self.y + 60, 30, pr.WHITE)
\ No newline at end of file
+        pr.draw_text(f"Worked Ha: {paddock.worked_ha:.2f}", self.x + 5, self.y + 5, 30, pr.WHITE)
+        pr.draw_text(f"Remain Ha: {max(0, paddock.ha - paddock.worked_ha):.2f}", self.x + 5, self.y + 60, 30, pr.WHITE)
@@ -0,0 +1,204 @@
+import pyray as pr
+import numpy as np
+
+import math
+
+from math import hypot
+
+class SegmentIndex:
+    """Static KD-tree over polyline segment midpoints for nearest segment lookups in O(log n)."""
+
+    LEAF_SIZE = 8
+
+    def __init__(self, points: np.ndarray) -> None:
+        starts = points[:-1]
+        ends = points[1:]
+        mids = (starts + ends) / 2
+
+        # Plain lists are much faster than NumPy for the scalar access done while querying
+        self.starts = starts.tolist()
+        self.ends = ends.tolist()
+
+        # Nodes are (axis, split, left, right, bounds) for branches or (-1, start, end, None, bounds) for leaves into `self.order`.
+        # Bounds cover the whole segments under the node, not just their midpoints, so they can be used to prune the search
+        self.order = []
+        self.nodes = []
+        self.root = self._build(np.arange(len(starts)), mids, np.minimum(starts, ends), np.maximum(starts, ends))
+
+    def _build(self, indices: np.ndarray, mids: np.ndarray, mins: np.ndarray, maxs: np.ndarray) -> int:
+        node_id = len(self.nodes)
+
+        min_x, min_y = mins[indices].min(axis=0).tolist()
+        max_x, max_y = maxs[indices].max(axis=0).tolist()
+        bounds = (min_x, min_y, max_x, max_y)
+
+        if len(indices) <= self.LEAF_SIZE:
+            self.nodes.append((-1, len(self.order), len(self.order) + len(indices), None, bounds))
+            self.order.extend(indices.tolist())
+            return node_id
+
+        spread = np.ptp(mids[indices], axis=0)
+        axis = int(np.argmax(spread))
+
+        indices = indices[np.argsort(mids[indices, axis], kind="stable")]
+        half = len(indices) // 2
+        split = float(mids[indices[half], axis])
+
+        self.nodes.append(None)
+        left = self._build(indices[:half], mids, mins, maxs)
+        right = self._build(indices[half:], mids, mins, maxs)
+        self.nodes[node_id] = (axis, split, left, right, bounds)
+
+        return node_id
+
+    def _segment_distance(self, i: int, px: float, py: float) -> tuple[float, float]:
+        """Returns: (distance, t) from the point to segment `i`, where `t` is how far along the segment the closest point is (0-1)."""
+
+        ax, ay = self.starts[i]
+        bx, by = self.ends[i]
+        dx = bx - ax
+        dy = by - ay
+
+        length_sq = dx * dx + dy * dy
+        t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+
+        return hypot(ax + dx * t - px, ay + dy * t - py), t
+
+    def nearest(self, px: float, py: float) -> tuple[int, float, float]:
+        """Returns: (segment index, distance, t) of the segment closest to the point."""
+
+        best = [-1, float("inf"), 0.0]
+        stack = [self.root]
+
+        while stack:
+            axis, a, b, c, (min_x, min_y, max_x, max_y) = self.nodes[stack.pop()]
+
+            # Checked on pop rather than push, by then the near side has usually tightened `best`
+            if hypot(max(min_x - px, 0.0, px - max_x), max(min_y - py, 0.0, py - max_y)) > best[1]: continue
+
+            if axis == -1:
+                for i in self.order[a:b]:
+                    distance, t = self._segment_distance(i, px, py)
+                    if distance < best[1]:
+                        best = [i, distance, t]
+                continue
+
+            diff = (px if axis == 0 else py) - a
+            near, far = (b, c) if diff < 0 else (c, b)
+
+            stack.append(far)
+            stack.append(near)
+
+        return best[0], best[1], best[2]
+
+class ContourLine:
+    """A recorded guidance polyline and its parallel passes, each `working_width` apart."""
+
+    PASS_CACHE_SIZE = 64 # Fewest offset passes kept, `reserve_passes` raises it to what's on screen
+
+    def __init__(self, points: list[tuple[float, float]]) -> None:
+        if len(points) < 2:
+            raise Exception(f"Contour line needs at least 2 points, only {len(points)} recorded!")
+
+        # Repeated points would leave zero length segments without a direction
+        points = [point for i, point in enumerate(points) if i == 0 or point != points[i - 1]]
+        if len(points) < 2:
+            raise Exception("Contour line doesn't go anywhere!")
+
+        self.points = np.array(points, dtype=np.float64)
+        self.index = SegmentIndex(self.points)
+
+        self.offset = 0.0 # Shift of every pass along the normal, set by nudging
+
+        # Unit direction and left normal of each segment, cached for the guidance queries
+        deltas = self.points[1:] - self.points[:-1]
+        lengths = np.hypot(*deltas.T)
+        lengths[lengths == 0] = 1.0
+
+        directions = deltas / lengths[:, None]
+        self.directions = directions.tolist()
+        self.normals = np.column_stack((-directions[:, 1], directions[:, 0])).tolist()
+
+        # Vertex normals (averaged between neighbouring segments) for offsetting the drawn passes
+        vertex_normals = np.empty_like(self.points)
+        vertex_normals[0] = self.normals[0]
+        vertex_normals[-1] = self.normals[-1]
+        vertex_normals[1:-1] = (np.array(self.normals[:-1]) + np.array(self.normals[1:])) / 2
+
+        norm = np.hypot(*vertex_normals.T)
+        norm[norm == 0] = 1.0
+        self.vertex_normals = vertex_normals / norm[:, None]
+
+        self.pass_cache = {} # (pass index, working width, offset): (owning vertex array, pointer)
+        self.pass_cache_size = self.PASS_CACHE_SIZE
+
+    def get_signed_offset(self, x: float, y: float) -> tuple[int, float, float, float]:
+        """Returns: (segment index, closest x, closest y, signed distance along the left normal) for the base line."""
+
+        i, distance, t = self.index.nearest(x, y)
+
+        ax, ay = self.index.starts[i]
+        dx, dy = self.directions[i]
+        nx, ny = self.normals[i]
+
+        length = hypot(self.index.ends[i][0] - ax, self.index.ends[i][1] - ay)
+        cx = ax + dx * length * t
+        cy = ay + dy * length * t
+
+        return i, cx, cy, (x - cx) * nx + (y - cy) * ny
+
+    def get_pass_index(self, x: float, y: float, working_width: float) -> int:
+        i, cx, cy, signed = self.get_signed_offset(x, y)
+        return round((signed - self.offset) / working_width)
+
+    def get_guidance(self, x: float, y: float, working_width: float) -> tuple[int, float, float, float, float]:
+        """Returns: (pass index, closest x, closest y, direction x, direction y) for the pass nearest the point."""
+
+        i, cx, cy, signed = self.get_signed_offset(x, y)
+        pass_index = round((signed - self.offset) / working_width)
+
+        nx, ny = self.normals[i]
+        pass_offset = self.offset + pass_index * working_width
+
+        dx, dy = self.directions[i]
+
+        return pass_index, cx + nx * pass_offset, cy + ny * pass_offset, dx, dy
+
+    def get_visible_passes(self, view: list[tuple[float, float]], working_width: float) -> range:
+        """
+        Returns: the pass indices that can cross the `view` polygon (world space).
+        The line curves, so the edge midpoints and centre are sampled as well as the corners and one pass either side is added.
+        """
+
+        points = list(view)
+        for i in range(len(view)):
+            points.append(((view[i - 1][0] + view[i][0]) / 2, (view[i - 1][1] + view[i][1]) / 2))
+        points.append((sum(x for x, y in view) / len(view), sum(y for x, y in view) / len(view)))
+
+        offsets = [(self.get_signed_offset(x, y)[3] - self.offset) / working_width for x, y in points]
+
+        return range(math.floor(min(offsets)) - 1, math.ceil(max(offsets)) + 2)
+
+    def reserve_passes(self, count: int) -> None:
+        """Makes sure at least `count` passes stay cached, so drawing a full screen of passes doesn't rebuild them every frame."""
+
+        # Twice over so passes scrolling onto the screen don't fill the cache and clear it
+        self.pass_cache_size = max(self.PASS_CACHE_SIZE, 2 * count)
+
+    def nudge(self, x: float, y: float) -> None:
+        i, cx, cy, signed = self.get_signed_offset(x, y)
+        self.offset = signed
+
+    def get_pass_vertices(self, pass_index: int, working_width: float) -> tuple[any, int]:
+        """Returns: (`Vector2 *`, vertex count) of the offset pass, cached until the width or offset changes."""
+
+        key = (pass_index, working_width, self.offset)
+
+        if key not in self.pass_cache:
+            if len(self.pass_cache) >= self.pass_cache_size:
+                self.pass_cache = {}
+
+            vertices = (self.points + self.vertex_normals * (self.offset + pass_index * working_width)).astype(np.float32)
+            self.pass_cache[key] = (vertices, pr.ffi.cast("Vector2 *", pr.ffi.from_buffer(vertices)))
+
+        return self.pass_cache[key][1], len(self.points)
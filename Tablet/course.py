@@ -1,13 +1,30 @@
-import pyray as pr
-import json
 import math
 
-from UI import Button
-from math import atan2, degrees, cos, sin, radians
+from time import perf_counter, perf_counter_ns, sleep
+
+from contour import ContourLine
+from outline import BoundaryRecorder
+from steering import SteeringController, LegacyController
+from math import atan2, asin, degrees, cos, sin, radians
+
+class GuidanceMode:
+    AB = "ab"
+    CONTOUR = "contour"
 
 class CourseManager:
-    def __init__(self, get_working_width: object) -> None:
+    CONTOUR_POINT_SPACING = 5 # World units driven between recorded contour points
+    CONTROL_HZ = 50
+
+    def __init__(self, get_working_width: object, control_hz: float = CONTROL_HZ, controller: SteeringController | None = None) -> None:
         self.get_working_width = get_working_width
+        self.controller = controller if controller is not None else LegacyController({}, 1)
+
+        # Guidance runs on its own thread at a fixed rate so steering doesn't depend on render load or saving.
+        # The pose is published as a single tuple (time, x, y, rotation rad, speed, working width, wheel rotation) so the control loop always reads a consistent snapshot
+        self.control_period = 1 / control_hz
+        self.control_running = False
+        self.pose = None
+        self.profiler = None # Optional `StageProfiler` each control update is recorded into as "guidance"
 
         self.run_dir = 0.0
         self.run_offset = 0.0
@@ -17,7 +34,15 @@ class CourseManager:
 
         self.a_point = None
 
-        self.closest_runline = None
+        # Runline vectors only depend on `run_dir`, the closest runline also on the offset, width and vehicle pass.
+        # Both caches are read and written by the control and render threads, so each is one tuple swapped in whole.
+        self.runline_vectors = (None, (1.0, 0.0), (0.0, 1.0)) # (run_dir, driving direction, perpendicular)
+        self.closest_runline = (None, None, None) # (key, pass index, (x, y) of a point on the runline pass the vehicle is on)
+
+        self.guidance_mode = GuidanceMode.AB
+        self.contour_line = None
+        self.contour_recorder = None # Only set while a contour pass is being recorded
+        self.last_contour_point = None
 
     @property
     def working_width(self) -> float: return self.get_working_width()
@@ -30,94 +55,223 @@ class CourseManager:
             else: self.run_dir = raw_run_dir % 180
 
             self.a_point = None
+            self.guidance_mode = GuidanceMode.AB
             print(f"Set {self.run_dir:.2f} degrees runlines.")
         else:
             self.a_point = (x, y)
 
-    def nudge_runlines(self, vehicle_pos: pr.Vector2) -> None:
-        run_rad = math.radians(self.run_dir)
+    @property
+    def recording_contour(self) -> bool:
+        return self.contour_recorder is not None
+
+    def start_contour_recording(self) -> None:
+        self.contour_recorder = BoundaryRecorder()
+        self.last_contour_point = None
+
+    def record_contour_point(self, x: float, y: float) -> None:
+        recorder = self.contour_recorder
+        if recorder is None: return
+
+        if self.last_contour_point is not None and math.dist(self.last_contour_point, (x, y)) < self.CONTOUR_POINT_SPACING: return
+
+        recorder.add((x, y))
+        self.last_contour_point = (x, y)
+
+    def finish_contour_recording(self) -> None:
+        """Turns the recorded pass into the contour guidance line and switches to contour guidance."""
+
+        recorder = self.contour_recorder
+        self.contour_recorder = None
+
+        self.contour_line = ContourLine(recorder.get_points())
+        self.guidance_mode = GuidanceMode.CONTOUR
 
-        # Direction vector of the runline (D) and its perpendicular normal (N)
-        dir_vec = pr.Vector2(math.cos(run_rad), math.sin(run_rad))
-        normal_vec = pr.Vector2(-dir_vec.y, dir_vec.x)
+        print(f"Set contour line with {len(recorder)} points.")
+
+    def nudge_runlines(self, x: float, y: float) -> None:
+        if self.guidance_mode == GuidanceMode.CONTOUR and self.contour_line is not None:
+            self.contour_line.nudge(x, y)
+            return
+
+        dir_vec, line_vec = self.get_runline_vectors()
 
         # Project vehicle position onto the normal (how far the vehicle is offset from runline origin)
-        offset_from_origin = vehicle_pos.x * normal_vec.x + vehicle_pos.y * normal_vec.y
-
-        self.run_offset = offset_from_origin
-
-    def get_rotation_angle_0_180(self, vehicle_rotation_rad, run_dir_deg):
-        run_dir_rad = math.radians(run_dir_deg)
-        runline_vec = (math.cos(run_dir_rad), math.sin(run_dir_rad))
-        perp_runline_vec = (-runline_vec[1], runline_vec[0])
-        vehicle_vec = (math.cos(vehicle_rotation_rad), math.sin(vehicle_rotation_rad))
-        dot = vehicle_vec[0]*runline_vec[0] + vehicle_vec[1]*runline_vec[1]
-        dot = max(min(dot, 1.0), -1.0)
-        angle_diff = math.acos(dot)
-        cross = perp_runline_vec[0]*vehicle_vec[1] - perp_runline_vec[1]*vehicle_vec[0]
-        angle_diff_deg = math.degrees(angle_diff) - 90
-        return angle_diff_deg
-
-    def get_side_of_line(self, A: pr.Vector2, B: pr.Vector2, P: pr.Vector2) -> int:
-        AB = pr.Vector2(B.x - A.x, B.y - A.y)
-        AP = pr.Vector2(P.x - A.x, P.y - A.y)
-        
-        cross = AB.x * AP.y - AB.y * AP.x
-
-        if cross > 0:
-            return -1
-        elif cross < 0:
-            return 1
-        else:
-            return 0
+        self.run_offset = x * line_vec[0] + y * line_vec[1]
 
-    def get_closest_point_on_line(self, A: pr.Vector2, B: pr.Vector2, P: pr.Vector2) -> pr.Vector2:
-        AB = pr.Vector2(B.x - A.x, B.y - A.y)
-        AP = pr.Vector2(P.x - A.x, P.y - A.y)
+    def get_runline_vectors(self, run_dir: float | None = None) -> tuple[tuple[float, float], tuple[float, float]]:
+        """Returns: (driving direction, perpendicular) unit vectors for `run_dir`, the current one by default."""
 
-        ab_dot_ab = AB.x * AB.x + AB.y * AB.y
-        ap_dot_ab = AP.x * AB.x + AP.y * AB.y
+        if run_dir is None: run_dir = self.run_dir
 
-        t = ap_dot_ab / ab_dot_ab
+        key, dir_vec, line_vec = self.runline_vectors
+        if key != run_dir:
+            angle_rad = radians(run_dir)
+            dir_vec = (cos(angle_rad), sin(angle_rad))
+            line_vec = (-dir_vec[1], dir_vec[0])
+            self.runline_vectors = (run_dir, dir_vec, line_vec)
 
-        # Clamp to segment if needed
-        # t = max(0, min(1, t))  # Uncomment if you want the closest point on the SEGMENT
+        return dir_vec, line_vec
 
-        closest = pr.Vector2(A.x + AB.x * t, A.y + AB.y * t)
-        return closest
+    def get_runline_index(self, x: float, y: float, working_width: float) -> int:
+        # `set_ab` and nudges can change these from another thread, so they're read once
+        run_dir = self.run_dir
+        run_offset = self.run_offset
 
-    def get_desired_rotation(self, wheel_rotation: float, vehicle_pos: pr.Vector2, vehicle_rotation: float, working_width: float) -> None:
-        if self.closest_runline is None: return
+        dir_vec, line_vec = self.get_runline_vectors(run_dir)
 
-        vr = vehicle_rotation
+        # Project vehicle position onto line direction to find its offset
+        vehicle_offset = x * line_vec[0] + y * line_vec[1]
+        return round((vehicle_offset - run_offset) / working_width)
 
-        align_steer = self.get_rotation_angle_0_180(vehicle_rotation - math.pi, self.run_dir)
+    def update_closest_runline(self, x: float, y: float, working_width: float) -> tuple[int, tuple[float, float], tuple[float, float]]:
+        """
+        Finds the runline pass the vehicle is on, only rebuilding `closest_runline` when that pass changes.
+        Returns: (pass index, (x, y) of a point on the pass, driving direction)
+        """
 
-        closest_runline_point = self.get_closest_point_on_line(self.closest_runline[0], self.closest_runline[1], vehicle_pos)
+        run_dir = self.run_dir
+        run_offset = self.run_offset
 
-        dx = closest_runline_point.x - vehicle_pos.x
-        dy = closest_runline_point.y - vehicle_pos.y
+        dir_vec, line_vec = self.get_runline_vectors(run_dir)
+        closest_line_index = round((x * line_vec[0] + y * line_vec[1] - run_offset) / working_width)
 
-        dist = math.hypot(dx, dy)
-        side = self.get_side_of_line(self.closest_runline[0], self.closest_runline[1], vehicle_pos)
- 
-        rel_rot = degrees(vr) - self.run_dir - 90
-        if rel_rot < 0: rel_rot += 360
+        key = (run_dir, run_offset, working_width, closest_line_index)
+        cached_key, index, point = self.closest_runline
 
-        if 90 < rel_rot < 270:
-            rel_rot = -1
-        else:
-            rel_rot = 1
+        if key != cached_key:
+            runline_offset = run_offset + closest_line_index * working_width
 
-        side *= rel_rot
+            index = closest_line_index
+            point = (line_vec[0] * runline_offset, line_vec[1] * runline_offset)
+            self.closest_runline = (key, index, point)
 
-        align_steer /= 90 * rel_rot
-        dir_to_run = side * (dist / self.working_width)
+        return index, point, dir_vec
 
-        self.desired_wheel_rotation = (dir_to_run + align_steer)
+    def get_visible_runlines(self, view: list[tuple[float, float]], working_width: float) -> list[tuple[int, tuple[float, float], tuple[float, float]]]:
+        """
+        Clips every runline crossing the convex `view` polygon (world space, either winding) to it.
+        Returns: [(pass index, start, end), ...]
+        """
 
-    def update(self, wheel_rotation: float, vehicle_pos: pr.Vector2, vehicle_rotation: float, working_width: float) -> None:
-        if self.autosteer_enabled:
-            self.get_desired_rotation(wheel_rotation, vehicle_pos, vehicle_rotation, working_width)
-        else:
-            self.desired_wheel_rotation = None
\ No newline at end of file
+        run_offset = self.run_offset
+        dir_vec, line_vec = self.get_runline_vectors()
+
+        # Only passes between the view's smallest and largest perpendicular offset can cross it
+        offsets = [px * line_vec[0] + py * line_vec[1] for px, py in view]
+        first = math.ceil((min(offsets) - run_offset) / working_width)
+        last = math.floor((max(offsets) - run_offset) / working_width)
+
+        # Winding decides which side of each edge is inside
+        area = sum(view[i - 1][0] * view[i][1] - view[i][0] * view[i - 1][1] for i in range(len(view)))
+        winding = 1 if area > 0 else -1
+
+        runlines = []
+
+        for i in range(first, last + 1):
+            runline_offset = run_offset + i * working_width
+            bx = line_vec[0] * runline_offset
+            by = line_vec[1] * runline_offset
+
+            # Cyrus-Beck: narrow the line parameter range to the inside of every edge
+            t_min = -math.inf
+            t_max = math.inf
+
+            for j in range(len(view)):
+                ax, ay = view[j - 1]
+                ex, ey = view[j]
+
+                # Inward edge normal
+                nx = -(ey - ay) * winding
+                ny = (ex - ax) * winding
+
+                denom = nx * dir_vec[0] + ny * dir_vec[1]
+                num = nx * (bx - ax) + ny * (by - ay)
+
+                if denom == 0:
+                    if num < 0: break # Parallel to and outside this edge
+                    continue
+
+                t = -num / denom
+                if denom > 0: t_min = max(t_min, t)
+                else: t_max = min(t_max, t)
+            else:
+                if t_min < t_max:
+                    runlines.append((
+                        i,
+                        (bx + dir_vec[0] * t_min, by + dir_vec[1] * t_min),
+                        (bx + dir_vec[0] * t_max, by + dir_vec[1] * t_max)
+                    ))
+
+        return runlines
+
+    def get_guidance_line(self, x: float, y: float, working_width: float) -> tuple[float, float, float, float] | None:
+        """Returns: (x, y, direction x, direction y) of a point on the line the vehicle should follow and its unit direction, or `None` if there isn't one."""
+
+        if self.guidance_mode == GuidanceMode.CONTOUR:
+            if self.contour_line is None: return None
+
+            pass_index, line_x, line_y, dx, dy = self.contour_line.get_guidance(x, y, working_width)
+            return line_x, line_y, dx, dy
+
+        index, point, dir_vec = self.update_closest_runline(x, y, working_width)
+
+        return point[0], point[1], dir_vec[0], dir_vec[1]
+
+    def get_desired_rotation(self, x: float, y: float, vehicle_rotation: float, working_width: float, speed: float = 0.0) -> None:
+        guidance_line = self.get_guidance_line(x, y, working_width)
+        if guidance_line is None: return
+
+        line_x, line_y, dx, dy = guidance_line
+
+        sin_rot = sin(vehicle_rotation)
+        cos_rot = cos(vehicle_rotation)
+
+        # Errors are measured relative to whichever way along the line the vehicle is facing (forward is (sin, -cos))
+        facing = -1 if sin_rot * dx - cos_rot * dy < 0 else 1
+
+        # Signed so that a positive wheel rotation reduces both errors
+        cross_track = -(dx * (y - line_y) - dy * (x - line_x)) * facing
+        heading_error = asin(max(-1.0, min(1.0, cos_rot * dx + sin_rot * dy))) * facing
+
+        self.desired_wheel_rotation = self.controller.get_steering(cross_track, heading_error, speed, working_width)
+
+    def set_pose(self, x: float, y: float, vehicle_rotation: float, speed: float, working_width: float, wheel_rotation: float) -> None:
+        self.pose = (perf_counter(), x, y, vehicle_rotation, speed, working_width, wheel_rotation)
+
+    def update(self) -> None:
+        pose = self.pose
+
+        if not self.autosteer_enabled or pose is None or pose[5] == 0:
+            self.desired_wheel_rotation = None
+            return
+
+        pose_time, x, y, vehicle_rotation, speed, working_width, wheel_rotation = pose
+        self.get_desired_rotation(x, y, vehicle_rotation, working_width, speed)
+
+    def run_control_loop(self) -> None:
+        self.control_running = True
+        next_update = perf_counter()
+
+        while self.control_running:
+            start = perf_counter_ns()
+
+            try:
+                self.update()
+            except Exception as e:
+                print(f"Autosteer control error: {e}")
+                self.desired_wheel_rotation = None
+
+            if self.profiler is not None:
+                self.profiler.record("guidance", perf_counter_ns() - start)
+
+            next_update += self.control_period
+            delay = next_update - perf_counter()
+
+            if delay > 0:
+                sleep(delay)
+            else:
+                # Fell behind (e.g. the GIL was held for a long time), skip the missed updates rather than bursting through them
+                next_update = perf_counter()
+
+    def stop_control_loop(self) -> None:
+        self.control_running = False
\ No newline at end of file
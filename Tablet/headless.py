@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+# Must be set before pygame initializes in main
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame as pg
+
+from time import perf_counter_ns
+from typing import Iterable, Iterator
+
+from main import GPS
+from vehicle_trailer_simulation import make_trajectory, to_samples
+
+TABLET_PATH = os.path.dirname(os.path.abspath(__file__))
+
+class HeadlessGPS(GPS):
+    """
+    Runs the tablet's pose, tile, guidance and paint pipeline without a window, audio or keyboard.
+    Only the coverage masks are painted (no render textures), everything drawn on screen is skipped.
+    """
+
+    WIDTH = 1280
+    HEIGHT = 800
+
+    STAGES = ("pose", "tiles", "guidance", "paint", "obstacles")
+
+    def __init__(self, poses: Iterable[dict[str, any]], max_frames: int | None = None) -> None:
+        self.poses = poses
+        self.max_frames = max_frames
+
+        self.frames = 0
+        self.elapsed_ns = 0
+        self.stage_ns = {stage: 0 for stage in self.STAGES}
+
+        super().__init__()
+
+    def start_client(self) -> None:
+        self.client.connected = True
+
+    def start_control_loop(self) -> None:
+        pass # Guidance runs in the frame instead of on the control thread so its time can be measured
+
+    def init_display(self) -> None:
+        pass
+
+    def init_audio(self) -> None:
+        pass
+
+    def init_keyboard(self) -> None:
+        pass
+
+    def init_ui(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def create_tile_texture(self) -> None:
+        return None # Tiles only get a mask, `paint` skips tiles without a texture
+
+    def free_tile_texture(self, texture: None) -> None:
+        pass
+
+    def main(self) -> None:
+        self.course_manager.autosteer_enabled = True
+
+        empty_tiles = []
+        start = perf_counter_ns()
+
+        for data in self.poses:
+            if self.max_frames is not None and self.frames >= self.max_frames:
+                break
+
+            t0 = perf_counter_ns()
+
+            self.client.data = data
+            self.publish_pose(data)
+            self.update_pose()
+
+            t1 = perf_counter_ns()
+
+            loaded_textures = self.update_tiles(empty_tiles)
+
+            t2 = perf_counter_ns()
+
+            self.course_manager.update()
+            self.get_runline_segments()
+
+            t3 = perf_counter_ns()
+
+            trailer_left, trailer_right = self.get_bar(self.trailer)
+            self.record_boundary(trailer_left, trailer_right)
+            self.paint(self.get_swaths(self.get_bars()), 1.5*self.mag/2, loaded_textures)
+
+            t4 = perf_counter_ns()
+
+            if self.paddock_manager.active_paddock is not None:
+                self.obstacle_warner.update(self.paddock_manager.active_paddock.obstacles, (self.vehicle.x, self.vehicle.y), self.vehicle.rad, trailer_left, trailer_right, self.vehicle.speed)
+
+            t5 = perf_counter_ns()
+
+            for stage, duration in zip(self.STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+                self.stage_ns[stage] += duration
+
+            self.frames += 1
+
+        self.elapsed_ns = perf_counter_ns() - start
+
+    def get_report(self) -> dict[str, float]:
+        frames = max(self.frames, 1)
+
+        report = {
+            "frames": self.frames,
+            "fps": self.frames / (self.elapsed_ns / 1e9) if self.elapsed_ns > 0 else 0.0,
+            "worked_ha": self.paddock_manager.active_paddock.worked_ha
+        }
+        report.update({f"{stage}_ms": ns / frames / 1e6 for stage, ns in self.stage_ns.items()})
+
+        return report
+
+def load_replay(path: str, speed: float) -> Iterator[dict[str, any]]:
+    sys.path.insert(0, os.path.join(TABLET_PATH, "..", "Server"))
+    from telemetry import ReplaySource
+
+    return iter(ReplaySource(path, speed))
+
+def run_headless(poses: Iterable[dict[str, any]], max_frames: int | None = None) -> dict[str, float]:
+    """Runs in a scratch directory so the paddock data it creates doesn't touch the tablet's own."""
+
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(os.path.join(TABLET_PATH, "settings.json"), directory)
+        os.chdir(directory)
+
+        try:
+            gps = HeadlessGPS(poses, max_frames)
+        finally:
+            os.chdir(cwd)
+
+        return gps.get_report()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the tablet pipeline without a display and report its performance.")
+    parser.add_argument("--replay", default=None, help="Telemetry session to replay instead of a synthetic field")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed factor, 0 replays as fast as possible")
+    parser.add_argument("--pattern", choices=("ab", "contour", "random"), default="ab", help="Synthetic field to drive")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random field")
+    parser.add_argument("--passes", type=int, default=6)
+    parser.add_argument("--length", type=float, default=200.0, help="Metres per synthetic pass")
+    parser.add_argument("--frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        poses = load_replay(args.replay, args.speed)
+    else:
+        trajectory, work_width = make_trajectory(args.pattern, args.seed, args.passes, args.length)
+        poses = to_samples(trajectory, work_width)
+
+    report = run_headless(poses, args.frames)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"{report['frames']} frames at {report['fps']:.1f} fps, {report['worked_ha']:.3f} ha worked")
+        for stage in HeadlessGPS.STAGES:
+            print(f"    {stage:<10} {report[f'{stage}_ms']:8.3f} ms/frame")
@@ -7,14 +7,22 @@ import sys
 import shutil
 
 from paddock import PaddockManager, Paddock, OutlineSide
-from course import CourseManager
+from course import CourseManager, GuidanceMode
+from obstacle import ObstacleWarner
+from steering import create_controller
+from profiler import StageProfiler
 
 from UI import Sidebar, Button, BottomBox
 from infobox import InfoBox
 from math import atan2, sin, cos, radians, degrees, dist, sqrt, floor, ceil
 from threading import Thread
-from pynput import keyboard
-from time import sleep
+from time import sleep, perf_counter, strftime
+
+try:
+    from pynput import keyboard
+except Exception as e:
+    keyboard = None # No keyboard shortcuts, e.g. without an X server
+    print(f"Failed to initialize keyboard shortcuts! Error: {e}")
 
 pg.init()
 
@@ -34,6 +42,10 @@ class Client:
 
         self.recieved_wheel_connect = False
 
+        self.on_data = None # Called from this thread with each decoded packet
+
+    RECV_SIZE = 65536 # Packets carry a record per attached implement so can be well over 1 KiB
+
     def run(self) -> None:
         while 1:
             try:
@@ -50,13 +62,16 @@ class Client:
 
                     while 1:
                         try:
-                            data = s.recv(1024)
+                            data = s.recv(self.RECV_SIZE)
                             if not data:
                                 print("No data, leaving")
                                 break
 
                             try:
                                 self.data = json.loads(data.decode())
+
+                                if self.on_data is not None:
+                                    self.on_data(self.data)
                             except Exception as e:
                                 print(f"Inner client try error: {e}")
 
@@ -78,21 +93,55 @@ class Client:
                 self.connected = False
 
 class Vehicle:
+    SPEED_SMOOTHING = 0.3
+    STOPPED_TIMEOUT = 0.5 # Seconds without a pose change before the vehicle is considered stopped
+
     def __init__(self) -> None:
         self.x = 0.0
         self.y = 0.0
         self.rotation = 0.0
+
+        self.speed = 0.0 # World units per second, derived from successive poses
+        self.last_pose_time = None
     
     @property
     def rad(self) -> float:
         return radians(self.rotation)
 
+    def set_pose(self, x: float, y: float, rotation: float) -> None:
+        now = perf_counter()
+
+        if x == self.x and y == self.y:
+            # Telemetry arrives slower than frames are drawn, so only treat the vehicle as stopped after a while
+            if self.last_pose_time is not None and now - self.last_pose_time > self.STOPPED_TIMEOUT:
+                self.speed = 0.0
+
+            self.rotation = rotation
+            return
+
+        if self.last_pose_time is not None:
+            dt = now - self.last_pose_time
+            if dt > 0:
+                self.speed += (dist((self.x, self.y), (x, y)) / dt - self.speed) * self.SPEED_SMOOTHING
+
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.last_pose_time = now
+
 class Trailer:
     def __init__(self) -> None:
         self.x = 0.0
         self.y = 0.0
         self.rotation = 0.0
 
+        self.work_offset = 0.0 # World units the worked area's centre is left of the tool
+
+        self.id = None # Implement's node id in game, `None` when only the last implement is exported
+        self.width = 0.0 # World units
+        self.on = False
+        self.lowered = True
+
     @property
     def rad(self) -> float:
         return radians(self.rotation)
@@ -105,6 +154,7 @@ class GPS:
     DEFAULT_WORK_WIDTH = 6
 
     PAINT_CYCLES = ((False, False), (True, False), (False, True), (True, True)) # (lowered, on) required
+    PROFILER_STAGES = ("telemetry", "tiles", "tile_draw", "boundaries", "runlines", "paint", "obstacles", "ui", "infoboxes", "present", "guidance") # Guidance is timed on the control thread
     GRID_SQUARE_SIZE = 100
 
     def __init__(self) -> None:
@@ -112,26 +162,14 @@ class GPS:
         self.settings = json.loads(open("settings.json", 'r').read())
 
         self.client = Client(self.settings, self.is_autosteer_enabled, self.get_desired_wheel_rotation)
-        Thread(target=self.client.run, daemon=True).start()
-
-        #pr.set_config_flags(pr.ConfigFlags.FLAG_MSAA_4X_HINT)
-        pr.init_window(self.WIDTH, self.HEIGHT, "TopconX35")
-        pr.set_target_fps(60)
-        pr.toggle_fullscreen()
-
-        pr.init_audio_device()
-
-        icon = pr.load_image("logo.png")
-        pr.set_window_icon(icon)
-        pr.unload_image(icon)
+        self.start_client()
 
-        pr.set_gestures_enabled(0)
-
-        self.keyboard_listener = keyboard.Listener(on_press=self.on_key_press, on_release=self.on_key_release)
-        self.keyboard_listener.setDaemon(True)
-        self.keyboard_listener.start()
+        self.init_display()
+        self.init_audio()
 
         self.pressed_keys = []
+        self.init_keyboard()
+
         self.infoboxes = []
 
         self.load_settings()
@@ -147,8 +185,13 @@ class GPS:
         self.last_boundary_rec_pos = [0, 0]
         self.tmp_paint_surf = pg.Surface((1000, 1000), pg.SRCALPHA)
 
-        self.paddock_manager = PaddockManager(self.infoboxes, self.remove_infobox, self.mag)
-        self.course_manager = CourseManager(self.get_working_width)
+        self.paddock_manager = PaddockManager(self.infoboxes, self.remove_infobox, self.mag, self.settings.get("auto_paddock_select", True))
+        self.course_manager = CourseManager(self.get_working_width, float(self.settings.get("autosteer_hz", CourseManager.CONTROL_HZ)), create_controller(self.settings, self.mag))
+        self.obstacle_warner = ObstacleWarner(self.settings, self.infoboxes, self.remove_infobox, self.mag)
+
+        self.profiler = StageProfiler(self.PROFILER_STAGES, int(self.settings.get("profiler_samples", 600)))
+        self.show_profiler = self.settings.get("profiler_overlay", False)
+        self.course_manager.profiler = self.profiler
         
         self.autosteer_engage_sound = pr.load_sound("assets/sounds/SteeringEngagedAlarm.wav")
         self.autosteer_disengage_sound = pr.load_sound("assets/sounds/SteeringDisengagedAlarm.wav")
@@ -164,12 +207,55 @@ class GPS:
 
         self.vehicle = Vehicle()
         self.trailer = Trailer()
+        self.trailer.width = self.working_width
+        self.implements = [self.trailer] # Every attached implement, the trailer is the last one the vehicle tows
 
-        self.sidebar = Sidebar(self.settings, self.is_autosteer_enabled, self.set_autosteer, self.paddock_manager, self.set_ab, self.nudge_runlines, self.save, self.cycle_paint_requirements, self.get_paint_requirements, self.zoom_in, self.zoom_out)
-        self.bottombox = BottomBox(self.paddock_manager)
+        self.control_vehicle = Vehicle() # Tracks speed from the poses given to the control loop, only touched by the client thread
+
+        # Poses go straight from the client thread to the control loop, so steering keeps updating while a frame or save is slow
+        self.client.on_data = self.publish_pose
+        self.start_control_loop()
+
+        self.init_ui()
 
         self.main()
 
+        self.close()
+
+    # Setup that needs a desktop, overridden by the headless tablet (headless.py)
+    def start_client(self) -> None:
+        Thread(target=self.client.run, daemon=True).start()
+
+    def start_control_loop(self) -> None:
+        Thread(target=self.course_manager.run_control_loop, daemon=True).start()
+
+    def init_display(self) -> None:
+        #pr.set_config_flags(pr.ConfigFlags.FLAG_MSAA_4X_HINT)
+        pr.init_window(self.WIDTH, self.HEIGHT, "TopconX35")
+        pr.set_target_fps(60)
+        pr.toggle_fullscreen()
+
+        icon = pr.load_image("logo.png")
+        pr.set_window_icon(icon)
+        pr.unload_image(icon)
+
+        pr.set_gestures_enabled(0)
+
+    def init_audio(self) -> None:
+        pr.init_audio_device()
+
+    def init_keyboard(self) -> None:
+        if keyboard is None: return
+
+        self.keyboard_listener = keyboard.Listener(on_press=self.on_key_press, on_release=self.on_key_release)
+        self.keyboard_listener.setDaemon(True)
+        self.keyboard_listener.start()
+
+    def init_ui(self) -> None:
+        self.sidebar = Sidebar(self.settings, self.is_autosteer_enabled, self.set_autosteer, self.paddock_manager, self.set_ab, self.nudge_runlines, self.save, self.cycle_paint_requirements, self.get_paint_requirements, self.zoom_in, self.zoom_out)
+        self.bottombox = BottomBox(self.paddock_manager)
+
+    def close(self) -> None:
         pr.close_window()
 
     @property
@@ -218,6 +304,14 @@ class GPS:
     def get_desired_wheel_rotation(self) -> float | None:
         return self.course_manager.desired_wheel_rotation
 
+    def publish_pose(self, data: dict[str, any]) -> None:
+        work_width = data.get("workWidth", None)
+        working_width = work_width * self.mag if work_width else self.working_width
+
+        self.control_vehicle.set_pose(data.get('vx', 0)*self.mag, data.get('vz', 0)*self.mag, data.get('vry', 0))
+
+        self.course_manager.set_pose(self.control_vehicle.x, self.control_vehicle.y, self.control_vehicle.rad, self.control_vehicle.speed, working_width, data.get("wheel_rot", 0.0))
+
     def reset_paint(self) -> None:
         for coord, texture in self.paint_tex_grid.items():
             pr.unload_render_texture(texture)
@@ -236,9 +330,37 @@ class GPS:
             self.infoboxes.append(InfoBox("A point set.", 'info', self.remove_infobox))
 
     def nudge_runlines(self) -> None:
-        self.course_manager.nudge_runlines(pr.Vector2(self.vehicle.x, self.vehicle.y))
+        self.course_manager.nudge_runlines(self.vehicle.x, self.vehicle.y)
         self.infoboxes.append(InfoBox("Runlines nudged to vehicle position.", 'info', self.remove_infobox))
 
+    def toggle_contour_recording(self) -> None:
+        if not self.course_manager.recording_contour:
+            self.course_manager.start_contour_recording()
+            self.infoboxes.append(InfoBox("Recording contour line...", 'info', self.remove_infobox))
+            return
+
+        try:
+            self.course_manager.finish_contour_recording()
+        except Exception as e:
+            print(f"Failed to set contour line! Error: {e}")
+            self.infoboxes.append(InfoBox("Contour line too short!", 'warning', self.remove_infobox))
+            return
+
+        self.infoboxes.append(InfoBox("Contour line set.", 'info', self.remove_infobox))
+
+    def dump_profile(self) -> None:
+        path = f"profile_{strftime('%Y%m%d_%H%M%S')}.csv"
+
+        try:
+            self.profiler.dump_csv(path)
+        except Exception as e:
+            print(f"Failed to write profile! Error: {e}")
+            self.infoboxes.append(InfoBox("Failed to write profile!", 'error', self.remove_infobox))
+            return
+
+        print(f"Wrote frame profile to {path}.")
+        self.infoboxes.append(InfoBox(f"Wrote profile to {path}.", 'info', self.remove_infobox))
+
     def remove_infobox(self, infobox: InfoBox) -> None:
         self.infoboxes.remove(infobox)
 
@@ -274,6 +396,12 @@ class GPS:
                 self.nudge_runlines()
             elif key == keyboard.KeyCode.from_char('R'):
                 self.cycle_paint_requirements()
+            elif key == keyboard.KeyCode.from_char('C'):
+                self.toggle_contour_recording()
+            elif key == keyboard.KeyCode.from_char('P'):
+                self.show_profiler = not self.show_profiler
+            elif key == keyboard.KeyCode.from_char('D'):
+                self.dump_profile()
             elif key == keyboard.Key.enter:
                 self.set_autosteer(not self.is_autosteer_enabled())
         elif key == keyboard.Key.backspace:
@@ -371,9 +499,7 @@ class GPS:
         self.infoboxes.append(InfoBox("Data save successful!", 'info', self.remove_infobox))
 
     def update_vt_positions(self, new_work_width: float | None) -> None:
-        self.vehicle.x = self.client.data.get('vx', 0)*self.mag
-        self.vehicle.y = self.client.data.get('vz', 0)*self.mag
-        self.vehicle.rotation = self.client.data.get('vry', 0)
+        self.vehicle.set_pose(self.client.data.get('vx', 0)*self.mag, self.client.data.get('vz', 0)*self.mag, self.client.data.get('vry', 0))
 
         if new_work_width is None or new_work_width == 0:
             return
@@ -381,6 +507,35 @@ class GPS:
         self.trailer.x = self.client.data.get('tx', 0)*self.mag
         self.trailer.y = self.client.data.get('tz', 0)*self.mag
         self.trailer.rotation = self.client.data.get('try', 0)
+        self.trailer.work_offset = (self.client.data.get('workOffset', 0) or 0)*self.mag
+        self.trailer.width = new_work_width*self.mag
+        self.trailer.on = self.client.data.get('toolOn', False)
+        self.trailer.lowered = self.client.data.get('toolLowered', True)
+
+        records = self.client.data.get('implements', None)
+        if not records:
+            self.implements = [self.trailer]
+            return
+
+        # Reuse implements by id so they keep their state between updates
+        existing = {implement.id: implement for implement in self.implements}
+        implements = []
+
+        for record in records:
+            implement = existing.get(record.get('id'), None) or Trailer()
+
+            implement.id = record.get('id')
+            implement.x = (record.get('tx', 0) or 0)*self.mag
+            implement.y = (record.get('tz', 0) or 0)*self.mag
+            implement.rotation = record.get('try', 0) or 0
+            implement.work_offset = (record.get('offset', 0) or 0)*self.mag
+            implement.width = (record.get('width', 0) or 0)*self.mag
+            implement.on = record.get('on', False)
+            implement.lowered = record.get('lowered', True)
+
+            implements.append(implement)
+
+        self.implements = implements
 
     def rotate(self, origin, point, angle):
         """
@@ -395,9 +550,13 @@ class GPS:
         qy = oy + sin(angle) * (px - ox) + cos(angle) * (py - oy)
         return qx, qy
 
-    def get_working(self) -> bool:
-        on = self.client.data.get('toolOn', False)
-        lowered = self.client.data.get('toolLowered', True)
+    def get_working(self, implement: Trailer | None = None) -> bool:
+        if implement is None:
+            on = self.client.data.get('toolOn', False)
+            lowered = self.client.data.get('toolLowered', True)
+        else:
+            on = implement.on
+            lowered = implement.lowered
 
         on_required, lower_required = self.PAINT_CYCLES[self.paint_cycle_index]
 
@@ -406,8 +565,8 @@ class GPS:
         else:
             return False
 
-    def get_working_color(self) -> pr.Color:
-        working = self.get_working()
+    def get_working_color(self, implement: Trailer | None = None) -> pr.Color:
+        working = self.get_working(implement)
 
         if working: return pr.Color(0, 150, 0, 255)
         else: return pr.Color(255, 0, 0, 255)
@@ -457,44 +616,27 @@ class GPS:
 
         return size
 
-    def draw_runlines(self) -> None:
-        if self.working_width == 0: self.working_width = self.DEFAULT_WORK_WIDTH
-
-        vehicle_pos = pr.Vector2(self.vehicle.x, self.vehicle.y)
-        run_dir = self.course_manager.run_dir
-        offset = self.course_manager.run_offset
+    def get_view_polygon(self) -> list[tuple[float, float]]:
+        """Returns: the screen corners in world space. The camera rotates with the vehicle so this isn't axis aligned."""
 
-        # Convert angle to radians and get driving direction vector
-        angle_rad = radians(run_dir)
-        dir_vec = (cos(angle_rad), sin(angle_rad))
-        
-        # Get perpendicular vector (line direction)
-        line_vec = (-dir_vec[1], dir_vec[0])
+        corners = ((0, 0), (self.WIDTH, 0), (self.WIDTH, self.HEIGHT), (0, self.HEIGHT))
+        view = []
 
-        # Project vehicle position onto line direction to find its offset
-        vehicle_offset = vehicle_pos.x * line_vec[0] + vehicle_pos.y * line_vec[1]
+        for x, y in corners:
+            world = pr.get_screen_to_world_2d(pr.Vector2(x, y), self.camera)
+            view.append((world.x, world.y))
 
-        # Compute index of closest runline to the vehicle
-        rel_offset = vehicle_offset - offset
-        closest_line_index = round(rel_offset / self.working_width)
+        return view
 
-        #num_lines = 50
-        num_lines = int((self.WIDTH / self.working_width) / 2) + 5
+    def get_runline_segments(self) -> list[tuple[tuple[float, float], tuple[float, float], float, pr.Color]]:
+        """Returns: (start, end, thickness, color) of every runline on screen. Everything `draw_runlines` does short of drawing."""
 
-        # Draw 3 runlines: closest, one before, one after
-        for i in range(closest_line_index - num_lines + 1, closest_line_index + num_lines):
-            runline_offset = offset + i * self.working_width
-            x = line_vec[0] * runline_offset
-            y = line_vec[1] * runline_offset
-
-            # Generate long line along driving direction
-            length = 100000
-            dx = dir_vec[0] * length
-            dy = dir_vec[1] * length
+        if self.working_width == 0: self.working_width = self.DEFAULT_WORK_WIDTH
 
-            start = (x - dx, y - dy)
-            end = (x + dx, y + dy)
+        closest_line_index = self.course_manager.get_runline_index(self.vehicle.x, self.vehicle.y, self.working_width)
 
+        segments = []
+        for i, start, end in self.course_manager.get_visible_runlines(self.get_view_polygon(), self.working_width):
             w = 0.04
             color = pr.Color(255, 0, 0, 255)
 
@@ -502,10 +644,33 @@ class GPS:
                 w = 0.02
                 color = pr.Color(200, 0, 0, 128)
 
-            pr.draw_line_ex(start, end, w * self.zoom * self.mag, color)
+            segments.append((start, end, w * self.zoom * self.mag, color))
+
+        return segments
+
+    def draw_runlines(self) -> None:
+        for start, end, thickness, color in self.get_runline_segments():
+            pr.draw_line_ex(start, end, thickness, color)
+
+    def draw_contour_passes(self) -> None:
+        contour_line = self.course_manager.contour_line
+        if contour_line is None: return
 
-            if i == closest_line_index:
-                self.course_manager.closest_runline = (pr.Vector2(start[0], start[1]), pr.Vector2(end[0], end[1]))
+        if self.working_width == 0: self.working_width = self.DEFAULT_WORK_WIDTH
+
+        closest_pass_index = contour_line.get_pass_index(self.vehicle.x, self.vehicle.y, self.working_width)
+
+        # Only passes crossing the rotated, zoomed view, the same as `get_visible_runlines` does for AB lines
+        passes = contour_line.get_visible_passes(self.get_view_polygon(), self.working_width)
+        contour_line.reserve_passes(len(passes))
+
+        for i in passes:
+            vertices, count = contour_line.get_pass_vertices(i, self.working_width)
+
+            if i == closest_pass_index:
+                pr.draw_line_strip(vertices, count, pr.Color(255, 0, 0, 255))
+            else:
+                pr.draw_line_strip(vertices, count, pr.Color(200, 0, 0, 128))
 
     def get_textures_in_rect(self, rect: pr.Rectangle, add: bool = False) -> tuple[list[tuple[tuple[int, int], pr.RenderTexture, pg.Mask]], tuple[int, int]]:
         rect_start = (rect.x / self.CHUNK_SIZE, rect.y / self.CHUNK_SIZE)
@@ -521,7 +686,7 @@ class GPS:
                 
                 # Create a new render texture and add it to the grid
                 elif add:
-                    tex = pr.load_render_texture(self.CHUNK_SIZE, self.CHUNK_SIZE)
+                    tex = self.create_tile_texture()
                     self.paint_tex_grid[(x, y)] = tex
 
                     mask = pg.Mask((self.CHUNK_SIZE, self.CHUNK_SIZE))
@@ -532,69 +697,139 @@ class GPS:
 
         return textures, tmp_tiles
 
-    def paint(self, start: tuple[int, int], end: tuple[int, int], width: float, color: pr.Color, loaded_textures: list[tuple[tuple[int, int], pr.RenderTexture]]) -> None:
-        for (tx, ty), texture, mask in loaded_textures:
-            pr.begin_texture_mode(texture)
-            pr.draw_line_ex((start[0] - tx * self.CHUNK_SIZE, self.CHUNK_SIZE - (start[1] - ty * self.CHUNK_SIZE)), (end[0] - tx * self.CHUNK_SIZE, self.CHUNK_SIZE - (end[1] - ty * self.CHUNK_SIZE)), width, color)
-            pr.end_texture_mode()
+    def create_tile_texture(self) -> pr.RenderTexture:
+        return pr.load_render_texture(self.CHUNK_SIZE, self.CHUNK_SIZE)
 
-            self.tmp_paint_surf.fill((0, 0, 0, 0))
-            pg.draw.line(self.tmp_paint_surf, (255, 255, 255), (start[0] - tx * self.CHUNK_SIZE, start[1] - ty * self.CHUNK_SIZE), (end[0] - tx * self.CHUNK_SIZE, end[1] - ty * self.CHUNK_SIZE), width=int(width))
+    def free_tile_texture(self, texture: pr.RenderTexture) -> None:
+        pr.unload_render_texture(texture)
 
-            og_area = mask.count()
+    def update_pose(self) -> None:
+        new_work_width = self.client.data.get("workWidth", None)
+        self.update_vt_positions(new_work_width)
 
-            paint_mask = pg.mask.from_surface(self.tmp_paint_surf, threshold = 254)
-            mask.draw(paint_mask, (0, 0))
-            self.paddock_manager.active_paddock.paint_mask_grid[(tx, ty)] = mask
+        if new_work_width is not None:
+            self.working_width = new_work_width * self.mag 
 
-            new_area = mask.count()
-            ha = ((new_area - og_area) / (self.mag ** 2)) / 10000
+        self.camera.target = pr.Vector2(self.vehicle.x, self.vehicle.y)  # World coords to follow
+        self.camera.offset = pr.Vector2(self.WIDTH / 2, self.HEIGHT / 2 + self.HEIGHT / 8)  # Keep centered on screen
+        self.camera.zoom = self.zoom
+        self.camera.rotation = -self.vehicle.rotation
 
-            self.paddock_manager.active_paddock.worked_ha += ha 
+    def update_tiles(self, empty_tiles: list[tuple[int, int]]) -> list[tuple[tuple[int, int], pr.RenderTexture, pg.Mask]]:
+        """Loads the tiles around the vehicle and culls empty tiles that are out of range. Returns: the loaded tiles."""
 
-    def draw_lined_polygon(self, poly: list[tuple[float, float]]) -> None:
-        for i, point in enumerate(poly[:-1]):
-            pr.draw_line_ex(point, poly[i+1], 1.0, pr.BLUE)
+        self.paddock_manager.update(self.vehicle.x, self.vehicle.y)
 
-    def main(self) -> None:
-        empty_tiles = [] # Tiles that have been created that may not have been written to from moving around (wont exist on disk) can fill up ram if built up
-        while not pr.window_should_close():
-            pr.begin_drawing()
-            pr.clear_background((50, 50, 50))
+        loaded_textures, new_tiles = self.get_textures_in_rect(pr.Rectangle(self.vehicle.x - self.WIDTH, self.vehicle.y - self.HEIGHT, self.WIDTH * 2, self.HEIGHT * 2), add=True)
 
-            new_work_width = self.client.data.get("workWidth", None)
-            self.update_vt_positions(new_work_width)
+        loaded_tiles = [texture[0] for texture in loaded_textures]
+        empty_tiles_to_remove = []
+        for tile in empty_tiles:
+            if tile not in loaded_tiles and tile in self.paddock_manager.active_paddock.paint_mask_grid and self.paddock_manager.active_paddock.paint_mask_grid[tile].count() == 0:
+                empty_tiles_to_remove.append(tile)
 
-            if new_work_width is not None:
-                self.working_width = new_work_width * self.mag 
+        for tile in empty_tiles_to_remove:
+            if tile in self.paint_tex_grid:
+                self.free_tile_texture(self.paint_tex_grid[tile])
+                del self.paddock_manager.active_paddock.paint_tex_grid[tile]
 
-            self.camera.target = pr.Vector2(self.vehicle.x, self.vehicle.y)  # World coords to follow
-            self.camera.offset = pr.Vector2(self.WIDTH / 2, self.HEIGHT / 2 + self.HEIGHT / 8)  # Keep centered on screen
-            self.camera.zoom = self.zoom
-            self.camera.rotation = -self.vehicle.rotation
+            if tile in self.paddock_manager.active_paddock.paint_mask_grid:
+                del self.paddock_manager.active_paddock.paint_mask_grid[tile]
 
-            pr.begin_mode_2d(self.camera)
+            empty_tiles.remove(tile)
+            print(f"Culled empty tile: {tile}.")
+
+        empty_tiles.extend(new_tiles)
+
+        return loaded_textures
+
+    def record_boundary(self, trailer_left: tuple[float, float], trailer_right: tuple[float, float]) -> None:
+        if dist((self.vehicle.x, self.vehicle.y), self.last_boundary_rec_pos) > 5:
+            if self.paddock_manager.active_paddock is not None:
+                if self.paddock_manager.active_paddock.marking_boundary:
+                    if self.paddock_manager.outline_side == OutlineSide.LEFT:
+                        self.paddock_manager.active_paddock.new_boundary.add(trailer_left)
+                        self.last_boundary_rec_pos[0] = trailer_left[0]
+                        self.last_boundary_rec_pos[1] = trailer_left[1]
+                    else:
+                        self.paddock_manager.active_paddock.new_boundary.add(trailer_right)
+                        self.last_boundary_rec_pos[0] = trailer_right[0]
+                        self.last_boundary_rec_pos[1] = trailer_right[1]
+
+    def get_bars(self) -> list[tuple[Trailer, tuple[float, float], tuple[float, float]]]:
+        return [(implement, *self.get_bar(implement)) for implement in self.implements]
 
-            loaded_textures, new_tiles = self.get_textures_in_rect(pr.Rectangle(self.vehicle.x - self.WIDTH, self.vehicle.y - self.HEIGHT, self.WIDTH * 2, self.HEIGHT * 2), add=True)
+    def get_swaths(self, bars: list[tuple[Trailer, tuple[float, float], tuple[float, float]]]) -> list[tuple[tuple[float, float], tuple[float, float], pr.Color]]:
+        """Returns: (start, end, color) for every implement that is working."""
 
-            loaded_tiles = [texture[0] for texture in loaded_textures]
-            empty_tiles_to_remove = []
-            for tile in empty_tiles:
-                if tile not in loaded_tiles and tile in self.paddock_manager.active_paddock.paint_mask_grid and self.paddock_manager.active_paddock.paint_mask_grid[tile].count() == 0:
-                    empty_tiles_to_remove.append(tile)
+        swaths = []
+        for implement, left, right in bars:
+            if self.get_working(implement):
+                color = self.get_working_color(implement)
+                color.a = 255
+                swaths.append((left, right, color))
 
-            for tile in empty_tiles_to_remove:
-                if tile in self.paint_tex_grid:
-                    pr.unload_render_texture(self.paint_tex_grid[tile])
-                    del self.paddock_manager.active_paddock.paint_tex_grid[tile]
+        return swaths
 
-                if tile in self.paddock_manager.active_paddock.paint_mask_grid:
-                    del self.paddock_manager.active_paddock.paint_mask_grid[tile]
+    def get_bar(self, implement: Trailer) -> tuple[tuple[float, float], tuple[float, float]]:
+        """Returns: (left, right) ends of the implement's worked width."""
 
-                empty_tiles.remove(tile)
-                print(f"Culled empty tile: {tile}.")
+        # The worked area can sit to one side of the tool (offset is towards the tool's left)
+        bar_origin = (implement.x - cos(implement.rad) * implement.work_offset, implement.y - sin(implement.rad) * implement.work_offset)
 
-            empty_tiles.extend(new_tiles)
+        left = self.rotate(bar_origin, (bar_origin[0] - implement.width / 2, bar_origin[1]), implement.rad)
+        right = self.rotate(bar_origin, (bar_origin[0] + implement.width / 2, bar_origin[1]), implement.rad)
+
+        return left, right
+
+    def paint(self, swaths: list[tuple[tuple[float, float], tuple[float, float], pr.Color]], width: float, loaded_textures: list[tuple[tuple[int, int], pr.RenderTexture]]) -> None:
+        """Paints every (start, end, color) swath, with one texture pass and one coverage mask per tile."""
+
+        if len(swaths) == 0:
+            return
+
+        margin = width / 2
+        for (tx, ty), texture, mask in loaded_textures:
+            left = tx * self.CHUNK_SIZE
+            top = ty * self.CHUNK_SIZE
+
+            # Skip tiles none of the swaths reach
+            tile_swaths = [(start, end, color) for start, end, color in swaths if
+                min(start[0], end[0]) - margin < left + self.CHUNK_SIZE and max(start[0], end[0]) + margin > left and
+                min(start[1], end[1]) - margin < top + self.CHUNK_SIZE and max(start[1], end[1]) + margin > top]
+
+            if len(tile_swaths) == 0:
+                continue
+
+            # Headless runs only keep the coverage masks
+            if texture is not None:
+                pr.begin_texture_mode(texture)
+                for start, end, color in tile_swaths:
+                    pr.draw_line_ex((start[0] - left, self.CHUNK_SIZE - (start[1] - top)), (end[0] - left, self.CHUNK_SIZE - (end[1] - top)), width, color)
+                pr.end_texture_mode()
+
+            self.tmp_paint_surf.fill((0, 0, 0, 0))
+            for start, end, color in tile_swaths:
+                pg.draw.line(self.tmp_paint_surf, (255, 255, 255), (start[0] - left, start[1] - top), (end[0] - left, end[1] - top), width=int(width))
+
+            paint_mask = pg.mask.from_surface(self.tmp_paint_surf, threshold = 254)
+            self.paddock_manager.active_paddock.add_coverage((tx, ty), paint_mask)
+
+    def main(self) -> None:
+        empty_tiles = [] # Tiles that have been created that may not have been written to from moving around (wont exist on disk) can fill up ram if built up
+        while not pr.window_should_close():
+            self.profiler.start_frame()
+
+            pr.begin_drawing()
+            pr.clear_background((50, 50, 50))
+
+            self.update_pose()
+            self.profiler.lap("telemetry")
+
+            pr.begin_mode_2d(self.camera)
+
+            loaded_textures = self.update_tiles(empty_tiles)
+            self.profiler.lap("tiles")
 
             #for (tx, ty), texture in loaded_textures:
             #    pr.draw_texture(texture.texture, tx * self.CHUNK_SIZE, ty * self.CHUNK_SIZE, pr.GREEN)
@@ -602,14 +837,31 @@ class GPS:
             for (tx, ty), texture in self.paint_tex_grid.items():
                 pr.draw_texture(texture.texture, tx * self.CHUNK_SIZE, ty * self.CHUNK_SIZE, pr.WHITE)
 
+            self.profiler.lap("tile_draw")
+
             if self.paddock_manager.active_paddock is not None:
-                for name, piece in self.paddock_manager.active_paddock.boundaries.items():
-                    self.draw_lined_polygon(list(piece.exterior.coords))
-                    #print((piece.area / self.mag**2)/10000)
+                for name, outline in self.paddock_manager.active_paddock.boundary_outlines.items():
+                    outline.draw(self.zoom, pr.BLUE)
+
+                if self.paddock_manager.active_paddock.marking_boundary:
+                    self.paddock_manager.active_paddock.new_boundary.draw(pr.SKYBLUE)
 
                 #print(self.paddock_manager.active_paddock.worked_ha)
 
-            self.draw_runlines()
+            self.profiler.lap("boundaries")
+
+            if self.course_manager.guidance_mode == GuidanceMode.CONTOUR:
+                self.draw_contour_passes()
+            else:
+                self.draw_runlines()
+
+            # Read once, the keyboard thread can finish the recording (clearing the recorder) part way through the frame
+            contour_recorder = self.course_manager.contour_recorder
+            if contour_recorder is not None:
+                self.course_manager.record_contour_point(self.vehicle.x, self.vehicle.y)
+                contour_recorder.draw(pr.ORANGE)
+
+            self.profiler.lap("runlines")
 
             origin = (self.vehicle.x, self.vehicle.y)
             origin_front = (self.vehicle.x, self.vehicle.y - self.mag)
@@ -632,11 +884,7 @@ class GPS:
 
             rot_origin = (self.trailer.x, self.trailer.y)
 
-            trailer_left = self.rotate(rot_origin, (rot_origin[0] - self.working_width / 2, rot_origin[1]), self.trailer.rad)
-            trailer_right = self.rotate(rot_origin, (rot_origin[0] + self.working_width / 2, rot_origin[1]), self.trailer.rad)
-
-            trailer_left = (trailer_left[0], trailer_left[1])
-            trailer_right = (trailer_right[0], trailer_right[1])
+            trailer_left, trailer_right = self.get_bar(self.trailer)
 
             # Blue guideline
             #pr.draw_line_ex((self.vehicle.x, self.vehicle.y), rot_origin_front, 1, pr.DARKBLUE)
@@ -645,24 +893,21 @@ class GPS:
             if dist(rot_origin_front, (rot_origin)) < 400:
                 pr.draw_line_ex(rot_origin_front, rot_origin, 0.5, pr.BLACK)
 
-            color = self.get_working_color()
-            color.a = 255
-            pr.draw_line_ex(trailer_left, trailer_right, 1.5*self.mag/2, color)
-
-            if dist((self.vehicle.x, self.vehicle.y), self.last_boundary_rec_pos) > 5:
-                if self.paddock_manager.active_paddock is not None:
-                    if self.paddock_manager.active_paddock.marking_boundary:
-                        if self.paddock_manager.outline_side == OutlineSide.LEFT:
-                            self.paddock_manager.active_paddock.new_boundary.append(trailer_left)
-                            self.last_boundary_rec_pos[0] = trailer_left[0]
-                            self.last_boundary_rec_pos[1] = trailer_left[1]
-                        else:
-                            self.paddock_manager.active_paddock.new_boundary.append(trailer_right)
-                            self.last_boundary_rec_pos[0] = trailer_right[0]
-                            self.last_boundary_rec_pos[1] = trailer_right[1]
-
-            if self.get_working():
-                self.paint(trailer_left, trailer_right, 1.5*self.mag/2, self.get_working_color(), loaded_textures)
+            bars = self.get_bars()
+            for implement, left, right in bars:
+                color = self.get_working_color(implement)
+                color.a = 255
+                pr.draw_line_ex(left, right, 1.5*self.mag/2, color)
+
+            self.record_boundary(trailer_left, trailer_right)
+
+            self.paint(self.get_swaths(bars), 1.5*self.mag/2, loaded_textures)
+            self.profiler.lap("paint")
+
+            if self.paddock_manager.active_paddock is not None:
+                self.obstacle_warner.update(self.paddock_manager.active_paddock.obstacles, (self.vehicle.x, self.vehicle.y), self.vehicle.rad, trailer_left, trailer_right, self.vehicle.speed)
+
+            self.profiler.lap("obstacles")
 
             pr.end_mode_2d()
 
@@ -673,18 +918,29 @@ class GPS:
             self.bottombox.update()
 
             if self.sidebar.settings_box.restart_required:
+                self.course_manager.stop_control_loop()
                 self.save()
                 return
 
+            self.profiler.lap("ui")
+
             for i, infobox in enumerate(self.infoboxes):
                 infobox.y = infobox.HEIGHT * i
                 infobox.update()
 
+            self.profiler.lap("infoboxes")
+
             pr.draw_fps(10, 10)
             pr.draw_text(f"Working width: {self.working_width / self.mag}m", 10, 30, 30, pr.GREEN)
 
+            if self.show_profiler:
+                self.profiler.draw(10, 70)
+
             pr.end_drawing()
 
+            self.profiler.lap("present") # Includes waiting for the frame limit
+            self.profiler.end_frame()
+
             if self.client.data.get("wheel_connect", False):
                 self.client.recieved_wheel_connect = True
                 self.set_autosteer(True)
@@ -693,8 +949,7 @@ class GPS:
                 print("Recieved wheel disconnect...")
                 self.set_autosteer(False)
 
-            self.course_manager.update(self.client.data.get("wheel_rot", 0.0), pr.Vector2(self.vehicle.x, self.vehicle.y), self.vehicle.rad, self.working_width)
-
+        self.course_manager.stop_control_loop()
         self.save()
 
 if __name__ == "__main__":
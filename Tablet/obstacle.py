@@ -0,0 +1,81 @@
+from math import sin, cos
+from shapely import MultiPoint, Polygon, STRtree
+
+from infobox import InfoBox
+
+class ObstacleWarner:
+    HORIZON = 3.0 # Seconds of travel the footprint is projected ahead
+    MIN_LOOKAHEAD = 2.0 # Metres. Keeps a footprint when stationary so sitting on top of an obstacle still warns
+    CLEARANCE = 2.0 # Metres the footprint has to pull away from an obstacle before it can warn again
+
+    def __init__(self, settings: dict[str, any], infoboxes: list[InfoBox], remove_infobox: object, mag: int) -> None:
+        self.infoboxes = infoboxes
+        self.remove_infobox = remove_infobox
+
+        self.mag = mag
+
+        self.horizon = float(settings.get("obstacle_warning_horizon", self.HORIZON))
+        self.min_lookahead = float(settings.get("obstacle_warning_min_lookahead", self.MIN_LOOKAHEAD)) * self.mag
+        self.clearance = float(settings.get("obstacle_warning_clearance", self.CLEARANCE)) * self.mag
+
+        self.tree = None
+        self.tree_names = []
+
+        # The index is rebuilt when any obstacle is added, removed or replaced.
+        # The tree keeps the indexed polygons alive, so their ids can't be reused by a new polygon while they're in the key.
+        self.indexed_key = None
+
+        self.warned = set() # Obstacle names that have already raised an alert and haven't been cleared yet
+        self.footprint = None
+
+    def get_index_key(self, obstacles: dict[str, Polygon]) -> tuple[tuple[str, int], ...]:
+        return tuple((name, id(obstacle)) for name, obstacle in obstacles.items())
+
+    def index_obstacles(self, obstacles: dict[str, Polygon]) -> None:
+        self.tree_names = list(obstacles.keys())
+        self.tree = STRtree(list(obstacles.values())) if len(obstacles) > 0 else None
+
+        self.indexed_key = self.get_index_key(obstacles)
+
+        self.warned &= set(self.tree_names)
+
+    def get_footprint(self, vehicle_pos: tuple[float, float], vehicle_rad: float, bar_left: tuple[float, float], bar_right: tuple[float, float], speed: float) -> Polygon:
+        """Returns the area swept by the vehicle and implement bar over the warning horizon along the current heading."""
+
+        lookahead = max(speed * self.horizon, self.min_lookahead)
+
+        # Forward is -y rotated by the heading (same convention as the vehicle triangle in `GPS.main`)
+        fx = sin(vehicle_rad) * lookahead
+        fy = -cos(vehicle_rad) * lookahead
+
+        return MultiPoint([
+            vehicle_pos, (vehicle_pos[0] + fx, vehicle_pos[1] + fy),
+            bar_left, (bar_left[0] + fx, bar_left[1] + fy),
+            bar_right, (bar_right[0] + fx, bar_right[1] + fy)
+        ]).convex_hull
+
+    def update(self, obstacles: dict[str, Polygon], vehicle_pos: tuple[float, float], vehicle_rad: float, bar_left: tuple[float, float], bar_right: tuple[float, float], speed: float) -> None:
+        if self.get_index_key(obstacles) != self.indexed_key:
+            self.index_obstacles(obstacles)
+
+        if self.tree is None:
+            self.footprint = None
+            return
+
+        self.footprint = self.get_footprint(vehicle_pos, vehicle_rad, bar_left, bar_right, speed)
+
+        hits = self.tree.query(self.footprint, predicate="intersects")
+        near = self.tree.query(self.footprint, predicate="dwithin", distance=self.clearance)
+
+        # Hysteresis: an obstacle stays warned until it is further than `clearance` from the footprint
+        self.warned &= {self.tree_names[i] for i in near}
+
+        for i in hits:
+            name = self.tree_names[i]
+            if name in self.warned: continue
+
+            self.warned.add(name)
+
+            text = f"Obstacle ahead: {name}!"
+            print(text)
+            self.infoboxes.append(InfoBox(text, 'error', self.remove_infobox))
@@ -0,0 +1,155 @@
+import pyray as pr
+
+from shapely import LineString, Polygon, make_valid
+
+class OutlineBuffer:
+    LOD_TOLERANCES = (0.0, 1.0, 4.0, 16.0, 64.0) # World units. Each level is simplified to within this distance of the original
+    MAX_ERROR_PIXELS = 1.0 # Coarsest level allowed is the one that stays within this many pixels on screen
+
+    def __init__(self, coords: list[tuple[float, float]]) -> None:
+        # (tolerance, owning vertex array, pointer passed to raylib, vertex count)
+        self.levels = []
+
+        line = LineString(coords)
+
+        for tolerance in self.LOD_TOLERANCES:
+            simplified = line.simplify(tolerance, preserve_topology=False) if tolerance > 0 else line
+            points = list(simplified.coords)
+
+            # Further simplification stopped removing anything, coarser levels would all be the same
+            if len(self.levels) > 0 and len(points) == self.levels[-1][3]:
+                break
+
+            vertices = pr.ffi.new("Vector2[]", len(points))
+            for i, (x, y) in enumerate(points):
+                vertices[i].x = x
+                vertices[i].y = y
+
+            # pyray can't pass a `Vector2[]` straight through, it needs a plain `Vector2 *`
+            self.levels.append((tolerance, vertices, pr.ffi.cast("Vector2 *", vertices), len(points)))
+
+    def get_level(self, zoom: float) -> tuple[float, any, any, int]:
+        max_error = self.MAX_ERROR_PIXELS / zoom
+
+        level = self.levels[0]
+        for candidate in self.levels:
+            if candidate[0] > max_error: break
+            level = candidate
+
+        return level
+
+    def draw(self, zoom: float, color: pr.Color) -> None:
+        tolerance, vertices, pointer, count = self.get_level(zoom)
+
+        pr.draw_line_strip(pointer, count, color)
+
+class BoundaryRecorder:
+    TOLERANCE = 1.5 # World units, matches the `simplify(1.5)` previously run on the finished boundary
+    WINDOW = 64 # Most points that can be held back before one is forced into the outline
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, tolerance: float = TOLERANCE, window: int = WINDOW) -> None:
+        self.tolerance = tolerance
+        self.window = window
+
+        self.points = [] # Kept vertices
+        self.pending = [] # Points since the last kept vertex that the outline may still skip
+
+        # Kept vertices are also written once into a growing vertex array so the preview is a single draw call
+        self.capacity = 0
+        self.vertices = None
+        self.pointer = None
+        self._grow(self.INITIAL_CAPACITY)
+
+    def __len__(self) -> int:
+        return len(self.points) + (1 if len(self.pending) > 0 else 0)
+
+    def _grow(self, capacity: int) -> None:
+        vertices = pr.ffi.new("Vector2[]", capacity)
+
+        if self.vertices is not None:
+            pr.ffi.memmove(vertices, self.vertices, pr.ffi.sizeof("Vector2") * self.capacity)
+
+        self.capacity = capacity
+        self.vertices = vertices
+        self.pointer = pr.ffi.cast("Vector2 *", vertices)
+
+    def _keep(self, point: tuple[float, float]) -> None:
+        # One spare slot is always left for the live tail drawn in `draw`
+        if len(self.points) + 1 >= self.capacity:
+            self._grow(self.capacity * 2)
+
+        self.vertices[len(self.points)].x = point[0]
+        self.vertices[len(self.points)].y = point[1]
+
+        self.points.append(point)
+
+    def _fits(self, end: tuple[float, float]) -> bool:
+        """Returns: `True` if every pending point is within tolerance of the segment from the last kept vertex to `end`."""
+
+        ax, ay = self.points[-1]
+        dx = end[0] - ax
+        dy = end[1] - ay
+        length_sq = dx * dx + dy * dy
+
+        for px, py in self.pending:
+            # Closest point on the segment, not the infinite line, so points doubling back past either end don't fit
+            t = 0.0 if length_sq == 0 else min(1.0, max(0.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+            dist_sq = (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+
+            if dist_sq > self.tolerance * self.tolerance:
+                return False
+
+        return True
+
+    def add(self, point: tuple[float, float]) -> None:
+        if len(self.points) == 0:
+            self._keep(point)
+            return
+
+        if len(self.pending) < self.window and self._fits(point):
+            self.pending.append(point)
+            return
+
+        # The last pending point was the furthest the current segment could reach, so it becomes a vertex
+        self._keep(self.pending[-1])
+        self.pending = [point]
+
+    def get_points(self) -> list[tuple[float, float]]:
+        if len(self.pending) > 0:
+            return self.points + [self.pending[-1]]
+
+        return list(self.points)
+
+    def to_polygon(self) -> Polygon:
+        """Closes the recorded outline. Self intersections from the driven path are repaired, keeping the largest part."""
+
+        points = self.get_points()
+        if len(points) < 3:
+            raise Exception(f"Boundary needs at least 3 points, only {len(points)} recorded!")
+
+        polygon = Polygon(points)
+        if polygon.is_valid:
+            return polygon
+
+        repaired = make_valid(polygon)
+        parts = [geom for geom in getattr(repaired, "geoms", [repaired]) if isinstance(geom, Polygon)]
+        if len(parts) == 0:
+            raise Exception("Recorded boundary is invalid, it doesn't enclose any area!")
+
+        return max(parts, key=lambda part: part.area)
+
+    def draw(self, color: pr.Color) -> None:
+        if len(self.points) == 0: return
+
+        count = len(self.points)
+
+        # The most recent pending point is drawn as a live tail but isn't kept yet
+        if len(self.pending) > 0:
+            self.vertices[count].x = self.pending[-1][0]
+            self.vertices[count].y = self.pending[-1][1]
+            count += 1
+
+        if count < 2: return
+
+        pr.draw_line_strip(self.pointer, count, color)
@@ -5,9 +5,12 @@ import shutil
 
 from ast import literal_eval
 from pathlib import Path
-from shapely import Polygon
+from queue import Queue, Empty
+from shapely import Polygon, contains_xy, prepare
+from threading import Thread
 
 from infobox import InfoBox
+from outline import OutlineBuffer, BoundaryRecorder
 
 class Paddock:
     CHUNK_SIZE = 1000
@@ -31,56 +34,145 @@ class Paddock:
         self.marking_boundary = False
         self.marking_obstacle = False
 
-        self.new_boundary = []
-        self.worked_ha = 0.0
+        self.new_boundary = BoundaryRecorder()
+        self.painted_ha = 0.0 # Everything painted, including outside the boundary pieces
+
+        self.piece_areas = {} # name: ha, cached so the boundary polygons aren't recomputed every frame
+        self.piece_worked_pixels = {} # name: painted pixels inside the piece
+        self.piece_masks = {} # name: {tile: rasterized piece mask, or `None` if the piece doesn't touch the tile}
+        self.boundary_outlines = {} # name: `OutlineBuffer`, so drawing doesn't convert the coordinates every frame
+        self.tmp_raster_surf = pg.Surface((self.CHUNK_SIZE, self.CHUNK_SIZE), pg.SRCALPHA)
+
+        self.pending_tiles = Queue()
+        self.stream_thread = None
+        self.load_generation = 0 # Bumped on every load/unload so stale streaming threads stop
+
+        self.save_thread = None # Writes tiles in the background when the paddock is switched while driving
 
     @property
     def ha(self) -> float:
-        return sum([(piece.area / self.mag ** 2) / 10000 for name, piece in self.boundaries.items()])
+        return sum(self.piece_areas.values())
 
-    def load(self) -> None:
-        self.paint_tex_grid = {}
-        paint_path = Path(self.file_path, ".paint-data")
+    @property
+    def worked_ha(self) -> float:
+        """Worked area clipped to the boundary pieces. Falls back to everything painted when there are no pieces."""
 
-        if paint_path.exists():
-            for filename in os.listdir(paint_path):
-                image = pr.load_image(str(Path(self.file_path, ".paint-data", filename)))
-                texture = pr.load_texture_from_image(image)
-                pr.unload_image(image)
+        if len(self.boundaries) == 0:
+            return self.painted_ha
 
-                x, y = filename.replace(".png", "").split("_")
+        return sum(self.get_piece_worked_ha(name) for name in self.boundaries)
 
-                self.paint_tex_grid[(int(x), int(y))] = pr.load_render_texture(self.CHUNK_SIZE, self.CHUNK_SIZE)
+    def get_piece_worked_ha(self, name: str) -> float:
+        return (self.piece_worked_pixels[name] / (self.mag ** 2)) / 10000
 
-                pr.begin_texture_mode(self.paint_tex_grid[(int(x), int(y))])
-                pr.rl_set_blend_mode(3)
-                pr.draw_texture_rec(texture, pr.Rectangle(0, 0, texture.width, -texture.height), (0, 0), pr.WHITE)
-                pr.rl_set_blend_mode(0)
-                pr.end_texture_mode()
-        else:
+    def add_piece(self, name: str, piece: Polygon) -> None:
+        self.boundaries[name] = piece
+        self.piece_areas[name] = (piece.area / self.mag ** 2) / 10000
+        self.piece_masks[name] = {}
+        self.boundary_outlines[name] = OutlineBuffer(list(piece.exterior.coords))
+
+        # Count what was already painted inside the piece; anything painted afterwards is counted by `add_coverage`
+        self.piece_worked_pixels[name] = 0
+        for coord, mask in self.paint_mask_grid.items():
+            piece_mask = self.get_piece_mask(name, coord)
+
+            if piece_mask is not None:
+                self.piece_worked_pixels[name] += mask.overlap_area(piece_mask, (0, 0))
+
+    def remove_piece(self, name: str) -> None:
+        del self.boundaries[name]
+        del self.piece_areas[name]
+        del self.piece_masks[name]
+        del self.piece_worked_pixels[name]
+        del self.boundary_outlines[name]
+
+    def get_piece_mask(self, name: str, coord: tuple[int, int]) -> pg.Mask | None:
+        """Returns the piece rasterized into tile space, building and caching it on first use."""
+
+        masks = self.piece_masks[name]
+        if coord in masks:
+            return masks[coord]
+
+        tx, ty = coord
+        min_x, min_y, max_x, max_y = self.boundaries[name].bounds
+
+        if max_x < tx * self.CHUNK_SIZE or min_x > (tx + 1) * self.CHUNK_SIZE or max_y < ty * self.CHUNK_SIZE or min_y > (ty + 1) * self.CHUNK_SIZE:
+            masks[coord] = None
+            return None
+
+        # Same tile space as the paint masks in `GPS.paint` (not flipped like the render textures)
+        points = [(x - tx * self.CHUNK_SIZE, y - ty * self.CHUNK_SIZE) for x, y in self.boundaries[name].exterior.coords]
+
+        self.tmp_raster_surf.fill((0, 0, 0, 0))
+        pg.draw.polygon(self.tmp_raster_surf, (255, 255, 255), points)
+
+        masks[coord] = pg.mask.from_surface(self.tmp_raster_surf, threshold = 254)
+        return masks[coord]
+
+    def add_coverage(self, coord: tuple[int, int], paint_mask: pg.Mask) -> None:
+        """Draws `paint_mask` into the tile's mask, counting only newly painted pixels towards the worked area."""
+
+        mask = self.paint_mask_grid[coord]
+        og_area = mask.count()
+
+        piece_masks = [(name, self.get_piece_mask(name, coord)) for name in self.boundaries]
+        piece_masks = [(name, piece_mask) for name, piece_mask in piece_masks if piece_mask is not None]
+
+        if len(piece_masks) > 0:
+            new_pixels = paint_mask.copy()
+            new_pixels.erase(mask, (0, 0))
+
+            for name, piece_mask in piece_masks:
+                self.piece_worked_pixels[name] += new_pixels.overlap_area(piece_mask, (0, 0))
+
+        mask.draw(paint_mask, (0, 0))
+
+        self.painted_ha += ((mask.count() - og_area) / (self.mag ** 2)) / 10000
+
+    def get_piece_stats(self) -> list[tuple[str, float, float]]:
+        """Returns: (name, worked ha, total ha) for every boundary piece."""
+
+        return [(name, self.get_piece_worked_ha(name), self.piece_areas[name]) for name in self.boundaries]
+
+    def load(self, stream: bool = False, near: tuple[float, float] | None = None) -> None:
+        """Loads the paddock from disk. With `stream` set, tiles are decoded on a background thread (closest to `near` first) and uploaded by `stream_tiles`."""
+
+        self.unload()
+        self.wait_for_save()
+
+        paint_path = Path(self.file_path, ".paint-data")
+
+        if not paint_path.exists():
             print(f"Paint data doesn't exist! Previous paint data cleared.")
             self.infoboxes.append(InfoBox("Paint data doesn't exist!", 'warning', self.remove_infobox))
 
             os.mkdir(paint_path)
 
-        self.paint_mask_grid = {}
         mask_path = Path(self.file_path, ".mask-data")
 
-        if mask_path.exists():
-            for filename in os.listdir(mask_path):
-                img = pg.image.load(str(Path(self.file_path, ".mask-data", filename)))
-                mask = pg.mask.from_threshold(img, (255, 255, 255, 255), (1, 1, 1, 255))
-
-                self.worked_ha += (mask.count() / (self.mag ** 2)) / 10000
-
-                x, y = filename.replace(".png", "").split("_")
-                self.paint_mask_grid[(int(x), int(y))] = mask
-        else:
+        if not mask_path.exists():
             print(f"Mask data doesn't exist! Previous mask data cleared.")
             self.infoboxes.append(InfoBox("Mask data doesn't exist!", 'warning', self.remove_infobox))
 
             os.mkdir(mask_path)
 
+        tiles = set()
+        for filename in os.listdir(paint_path) + os.listdir(mask_path):
+            x, y = filename.replace(".png", "").split("_")
+            tiles.add((int(x), int(y)))
+
+        tiles = list(tiles)
+        if near is not None:
+            near_tile = (near[0] / self.CHUNK_SIZE, near[1] / self.CHUNK_SIZE)
+            tiles.sort(key=lambda tile: (tile[0] - near_tile[0]) ** 2 + (tile[1] - near_tile[1]) ** 2)
+
+        if stream:
+            self.stream_thread = Thread(target=self._decode_tiles, args=(tiles, self.load_generation), daemon=True)
+            self.stream_thread.start()
+        else:
+            self._decode_tiles(tiles, self.load_generation)
+            self.stream_tiles()
+
         # AB data could also be changed or corrupted. More robust error handling should be implemented here too.
         self.runlines = {}
         run_path = Path(self.file_path, ".run-data")
@@ -97,6 +189,10 @@ class Paddock:
             os.mkdir(run_path)
             
         self.boundaries = {}
+        self.piece_areas = {}
+        self.piece_masks = {}
+        self.piece_worked_pixels = {}
+        self.boundary_outlines = {}
         self.obstacles = {}
 
         root_path = Path(self.file_path, ".boundary-data")
@@ -105,9 +201,8 @@ class Paddock:
 
         if root_path.exists():
             if boundaries_path.exists():
-                for file in os.listdir(boundaries_path):
-                    with open(os.path.join(boundaries_path, file), 'r') as f:
-                        self.boundaries[file] = Polygon(literal_eval(f.read()))
+                for name, piece in self.read_polygons(boundaries_path).items():
+                    self.add_piece(name, piece)
             else:
                 text = "Boundary data doesn't exist!"
                 print(text)
@@ -116,9 +211,7 @@ class Paddock:
                 os.mkdir(boundaries_path)
 
             if obstacles_path.exists():
-                for file in os.listdir(obstacles_path):
-                    with open(os.path.join(obstacles_path, file), 'r') as f:
-                        self.obstacles[file] = Polygon(literal_eval(f.read()))
+                self.obstacles = self.read_polygons(obstacles_path)
             else:
                 text = "Obstacle data doesn't exist!"
                 print(text)
@@ -134,8 +227,157 @@ class Paddock:
             os.mkdir(boundaries_path)
             os.mkdir(obstacles_path)
 
-    def save(self) -> None:
+    def read_polygons(self, path: str | Path) -> dict[str, Polygon]:
+        """Reads every polygon file in `path`. Missing directories read as empty so this can be used on paddocks that aren't loaded."""
+
+        polygons = {}
+
+        if not os.path.exists(path):
+            return polygons
+
+        for file in os.listdir(path):
+            with open(os.path.join(path, file), 'r') as f:
+                polygons[file] = Polygon(literal_eval(f.read()))
+
+        return polygons
+
+    def read_boundaries(self) -> dict[str, Polygon]:
+        return self.read_polygons(Path(self.file_path, ".boundary-data", "boundaries"))
+
+    def _decode_tiles(self, tiles: list[tuple[int, int]], generation: int) -> None:
+        # Only CPU side decoding happens here, textures have to be created on the main (GL) thread in `stream_tiles`
+        for (x, y) in tiles:
+            if generation != self.load_generation: return
+
+            image = None
+            paint_file = Path(self.file_path, ".paint-data", f"{x}_{y}.png")
+            if paint_file.exists():
+                image = pr.load_image(str(paint_file))
+
+            mask = None
+            mask_file = Path(self.file_path, ".mask-data", f"{x}_{y}.png")
+            if mask_file.exists():
+                img = pg.image.load(str(mask_file))
+                mask = pg.mask.from_threshold(img, (255, 255, 255, 255), (1, 1, 1, 255))
+
+            self.pending_tiles.put((generation, (x, y), image, mask))
+
+    @property
+    def streaming(self) -> bool:
+        return (self.stream_thread is not None and self.stream_thread.is_alive()) or not self.pending_tiles.empty()
+
+    def stream_tiles(self, max_tiles: int | None = None, wait: bool = False) -> None:
+        """Uploads decoded tiles into the grids. Must be called from the main thread. `wait` blocks until the whole paddock is loaded."""
+
+        if wait and self.stream_thread is not None:
+            self.stream_thread.join()
+
+        uploaded = 0
+        while max_tiles is None or uploaded < max_tiles:
+            try:
+                generation, coord, image, mask = self.pending_tiles.get_nowait()
+            except Empty:
+                break
+
+            # Decoded by a thread from a previous load that hadn't noticed it was cancelled yet
+            if generation != self.load_generation:
+                if image is not None:
+                    pr.unload_image(image)
+
+                continue
+
+            self._add_loaded_tile(coord, image, mask)
+            uploaded += 1
+
+        if self.stream_thread is not None and not self.streaming:
+            self.stream_thread = None
+
+    def _add_loaded_tile(self, coord: tuple[int, int], image: pr.Image, mask: pg.Mask) -> None:
+        # Tiles can already exist if they were painted on before they streamed in, so loaded data is merged in
+        if image is not None:
+            texture = pr.load_texture_from_image(image)
+            pr.unload_image(image)
+
+            if coord not in self.paint_tex_grid:
+                self.paint_tex_grid[coord] = pr.load_render_texture(self.CHUNK_SIZE, self.CHUNK_SIZE)
+
+            pr.begin_texture_mode(self.paint_tex_grid[coord])
+            pr.rl_set_blend_mode(3)
+            pr.draw_texture_rec(texture, pr.Rectangle(0, 0, texture.width, -texture.height), (0, 0), pr.WHITE)
+            pr.rl_set_blend_mode(0)
+            pr.end_texture_mode()
+
+            pr.unload_texture(texture)
+
+        # `GPS.get_textures_in_rect` expects every tile to have both a texture and a mask
+        if coord not in self.paint_tex_grid:
+            self.paint_tex_grid[coord] = pr.load_render_texture(self.CHUNK_SIZE, self.CHUNK_SIZE)
+
+        if coord not in self.paint_mask_grid:
+            self.paint_mask_grid[coord] = pg.Mask((self.CHUNK_SIZE, self.CHUNK_SIZE))
+
+        if mask is not None:
+            self.add_coverage(coord, mask)
+
+    def unload(self) -> None:
+        """Frees the tile textures and cancels any tile streaming still in progress."""
+
+        self.load_generation += 1
+
+        while True:
+            try:
+                generation, coord, image, mask = self.pending_tiles.get_nowait()
+            except Empty:
+                break
+
+            if image is not None:
+                pr.unload_image(image)
+
+        self.stream_thread = None
+
+        for coord, tex in self.paint_tex_grid.items():
+            pr.unload_render_texture(tex)
+
+        self.paint_tex_grid = {}
+        self.paint_mask_grid = {}
+        self.painted_ha = 0.0
+
+        for name in self.piece_worked_pixels:
+            self.piece_worked_pixels[name] = 0
+
+    def wait_for_save(self) -> None:
+        if self.save_thread is not None:
+            self.save_thread.join()
+            self.save_thread = None
+
+    def save(self, background: bool = False) -> None:
+        """
+        With `background` set, only the texture readback happens here and the tiles are encoded and written on a thread.
+        Must be called from the main thread either way.
+        """
+
         # This should never be called without the `load` method being called, that is why directories are assumed to be created here
+
+        # Tiles that haven't streamed in yet would be lost when the directories are rewritten
+        self.stream_tiles(wait=True)
+        self.wait_for_save()
+
+        # Masks are copied and textures read back now so painting (or unloading) can carry on while the tiles are written
+        masks = {coord: mask.copy() for coord, mask in self.paint_mask_grid.items() if mask.count() > 0}
+        images = {coord: pr.load_image_from_texture(tex.texture) for coord, tex in self.paint_tex_grid.items() if coord not in self.paint_mask_grid or coord in masks}
+
+        # Shallow copies so boundary and obstacle edits during a background write can't change the dicts it iterates
+        data = (masks, images, dict(self.runlines), dict(self.boundaries), dict(self.obstacles))
+
+        if background:
+            # Not a daemon so closing the tablet still finishes writing the paddock
+            self.save_thread = Thread(target=self._write, args=data)
+            self.save_thread.start()
+        else:
+            self._write(*data)
+            self.infoboxes.append(InfoBox(f"Data written for {self.name} paddock.", 'info', self.remove_infobox))
+
+    def _write(self, masks: dict[tuple[int, int], pg.Mask], images: dict[tuple[int, int], pr.Image], runlines: dict[str, tuple[float, float]], boundaries: dict[str, Polygon], obstacles: dict[str, Polygon]) -> None:
         paint_path = Path(self.file_path, ".paint-data")
         mask_path = Path(self.file_path, ".mask-data")
         run_path = Path(self.file_path, ".run-data")
@@ -149,38 +391,40 @@ class Paddock:
         os.mkdir(paint_path)
         os.mkdir(mask_path)
 
-        empty_tiles = []
-        for (x, y) in self.paint_mask_grid.keys():
-            if self.paint_mask_grid[(x, y)].count() == 0:
-                empty_tiles.append((x, y))
-                continue
-
-            surf = self.paint_mask_grid[(x, y)].to_surface()
+        # Empty tiles were already left out by `save`
+        for (x, y), mask in masks.items():
+            surf = mask.to_surface()
             pg.image.save(surf, os.path.join(mask_path, f"{x}_{y}.png"))
 
-        for (x, y) in self.paint_tex_grid.keys():
-            if (x, y) in empty_tiles: continue
-            image = pr.load_image_from_texture(self.paint_tex_grid[(x, y)].texture)
+        for (x, y), image in images.items():
             pr.export_image(image, os.path.join(paint_path, f"{x}_{y}.png"))
+            pr.unload_image(image)
 
-        for name, (run_dir, run_offset) in self.runlines:
+        for name, (run_dir, run_offset) in runlines.items():
             with open(os.path.join(run_path, name), "w") as f:
                 f.write(f"{run_dir},{run_offset}")
 
-        for name, boundary in self.boundaries.items():
+        for name, boundary in boundaries.items():
             with open(os.path.join(boundaries_path, name), 'w') as f:
                 f.write(str(list(boundary.exterior.coords)))
 
-        for name, obstacle in self.obstacles.items():
+        for name, obstacle in obstacles.items():
             with open(os.path.join(obstacles_path, name), 'w') as f:
                 f.write(str(list(obstacle.exterior.coords)))
 
-        self.infoboxes.append(InfoBox(f"Data written for {self.name} paddock.", 'info', self.remove_infobox))
+        print(f"Data written for {self.name} paddock.")
 
     def reset_paint(self) -> None:
+        for coord, tex in self.paint_tex_grid.items():
+            pr.unload_render_texture(tex)
+
         self.paint_tex_grid = {}
-        self.mask_tex_grid = {}
-        self.worked_ha = 0.0
+        self.paint_mask_grid = {}
+        self.painted_ha = 0.0
+
+        for name in self.piece_worked_pixels:
+            self.piece_worked_pixels[name] = 0
+
         self.infoboxes.append(InfoBox(f"Paint data cleared for {self.name} paddock.", 'warning', self.remove_infobox))
 
 class OutlineSide:
@@ -188,15 +432,21 @@ class OutlineSide:
     RIGHT = True
 
 class PaddockManager:
-    def __init__(self, infoboxes: list[InfoBox], remove_infobox: object, mag: int) -> None:
+    STREAM_TILES_PER_FRAME = 4 # Tiles uploaded per frame while a paddock streams in
+    def __init__(self, infoboxes: list[InfoBox], remove_infobox: object, mag: int, auto_select: bool = True) -> None:
         self.infoboxes = infoboxes
         self.remove_infobox = remove_infobox
 
         self.mag = mag
+        self.auto_select = auto_select
 
         self.paddocks = []
         self.active_paddock = None
 
+        # name: (min_x, min_y, max_x, max_y, prepared boundary pieces). Kept for every paddock, loaded or not
+        self.paddock_extents = {}
+        self.last_detected_paddock = None
+
         self.outline_side = OutlineSide.LEFT
 
         self._load_saved_data()
@@ -212,7 +462,10 @@ class PaddockManager:
             os.mkdir(".paddock-data")
 
         for pdk_dir in os.listdir(".paddock-data"):
-            self.paddocks.append(Paddock(pdk_dir, os.path.join(".paddock-data", pdk_dir), self.infoboxes, self.remove_infobox, self.mag))
+            paddock = Paddock(pdk_dir, os.path.join(".paddock-data", pdk_dir), self.infoboxes, self.remove_infobox, self.mag)
+
+            self.paddocks.append(paddock)
+            self.index_paddock(paddock, paddock.read_boundaries())
 
         if len(self.paddocks) == 0:
             self.create_paddock("default")
@@ -240,39 +493,111 @@ class PaddockManager:
         if name in self.get_piece_names():
             raise Exception(f"Piece name ({name}) already exists!")
 
-        self.active_paddock.boundaries[name] = Polygon(self.active_paddock.new_boundary).simplify(1.5, True)
-        self.active_paddock.new_boundary = []
+        try:
+            piece = self.active_paddock.new_boundary.to_polygon()
+        except Exception as e:
+            print(f"Failed to create piece {name}! Error: {e}")
+
+            # Too few points and rings that don't enclose anything need different fixes from the driver
+            text = "Boundary too small to create piece!" if len(self.active_paddock.new_boundary) < 3 else "Boundary is invalid, it doesn't enclose any area!"
+            self.infoboxes.append(InfoBox(text, 'warning', self.remove_infobox))
+            return
+
+        self.active_paddock.add_piece(name, piece)
+        self.active_paddock.new_boundary = BoundaryRecorder()
 
         self.active_paddock.marking_boundary = False
 
+        self.index_paddock(self.active_paddock, self.active_paddock.boundaries)
+
     def delete_piece(self, name: str) -> None:
         if self.active_paddock is None: return
 
         if name not in self.get_piece_names():
             raise Exception(f"Piece {name} is not found in paddock {self.active_paddock.name} data!")
 
-        del self.active_paddock.boundaries[name]
+        self.active_paddock.remove_piece(name)
+
+        self.index_paddock(self.active_paddock, self.active_paddock.boundaries)
+
+    def index_paddock(self, paddock: Paddock, boundaries: dict[str, Polygon]) -> None:
+        if len(boundaries) == 0:
+            self.paddock_extents.pop(paddock.name, None)
+            return
+
+        pieces = list(boundaries.values())
+        for piece in pieces:
+            prepare(piece)
+
+        min_x = min(piece.bounds[0] for piece in pieces)
+        min_y = min(piece.bounds[1] for piece in pieces)
+        max_x = max(piece.bounds[2] for piece in pieces)
+        max_y = max(piece.bounds[3] for piece in pieces)
+
+        self.paddock_extents[paddock.name] = (min_x, min_y, max_x, max_y, pieces)
+
+    def _extent_contains(self, name: str, x: float, y: float) -> bool:
+        min_x, min_y, max_x, max_y, pieces = self.paddock_extents[name]
 
-    def load_paddock(self, paddock_name: str) -> None:
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            return False
+
+        for piece in pieces:
+            if contains_xy(piece, x, y):
+                return True
+
+        return False
+
+    def get_paddock_at(self, x: float, y: float) -> str | None:
+        """Returns the name of the paddock whose boundary contains the point, or `None`. The active paddock is checked first."""
+
+        if self.active_paddock is not None and self.active_paddock.name in self.paddock_extents:
+            if self._extent_contains(self.active_paddock.name, x, y):
+                return self.active_paddock.name
+
+        for name in self.paddock_extents:
+            if self._extent_contains(name, x, y):
+                return name
+
+        return None
+
+    def update(self, x: float, y: float) -> None:
+        if self.active_paddock is not None:
+            self.active_paddock.stream_tiles(self.STREAM_TILES_PER_FRAME)
+
+        if not self.auto_select: return
+
+        detected = self.get_paddock_at(x, y)
+
+        # Only switch when entering a paddock so a manual selection isn't overridden while still inside another boundary
+        if detected == self.last_detected_paddock: return
+        self.last_detected_paddock = detected
+
+        if detected is None or self.active_paddock is None or detected == self.active_paddock.name: return
+
+        print(f"Entered {detected} paddock.")
+        self.load_paddock(detected, stream=True, near=(x, y))
+
+    def load_paddock(self, paddock_name: str, stream: bool = False, near: tuple[float, float] | None = None) -> None:
         paddock_names = self.get_paddock_names()
 
         if paddock_name not in paddock_names:
             raise Exception(f"Paddock name ({paddock_name}) not in paddocks!")
 
-        self.save_active_paddock()
+        # Switching while driving can't stall a frame on encoding every tile, so those saves finish in the background
+        self.save_active_paddock(background=stream)
 
         if self.active_paddock is not None:
-            for coord, tex in self.active_paddock.paint_tex_grid.items():
-                pr.unload_render_texture(tex)
+            self.active_paddock.unload()
 
         self.active_paddock = self.paddocks[paddock_names.index(paddock_name)]
-        self.active_paddock.load()
+        self.active_paddock.load(stream, near)
 
         self.infoboxes.append(InfoBox(f"Switched to {self.active_paddock.name} paddock.", 'info', self.remove_infobox))
 
-    def save_active_paddock(self) -> None:
+    def save_active_paddock(self, background: bool = False) -> None:
         if self.active_paddock is not None:
-            self.active_paddock.save()
+            self.active_paddock.save(background)
 
     def reset_paint(self) -> None:
         if self.active_paddock is None: return
@@ -288,6 +613,7 @@ class PaddockManager:
         os.mkdir(new_paddock_path)
 
         new_paddock = Paddock(name, new_paddock_path, self.infoboxes, self.remove_infobox, self.mag)
+        self.index_paddock(new_paddock, {})
 
         self.paddocks.append(new_paddock)
         self.load_paddock(name)
@@ -314,6 +640,7 @@ class PaddockManager:
 
         shutil.rmtree(paddock.file_path)
         self.paddocks.remove(paddock)
+        self.paddock_extents.pop(name, None)
 
         text = f"Deleted paddock: {name}!"
         print(text)
@@ -332,7 +659,7 @@ class PaddockManager:
             raise Exception("Already marking a paddock boundary!")
 
         self.active_paddock.marking_boundary = True
-        self.active_paddock.new_boundary = []
+        self.active_paddock.new_boundary = BoundaryRecorder()
 
     def is_marking_obstacle_outline(self) -> bool:
         """Returns: `True` if it is marking an obstacle, `False` if not."""
@@ -0,0 +1,102 @@
+import pyray as pr
+import csv
+
+from array import array
+from time import perf_counter_ns
+
+class StageProfiler:
+    """
+    Times each stage of a frame into a ring buffer of the last `size` samples per stage.
+    Stages are timed back to back with `lap`, or recorded directly with `record` (e.g. from the control thread).
+    """
+
+    REFRESH_FRAMES = 30 # Frames between recomputing the overlay's statistics
+    FONT_SIZE = 20
+
+    def __init__(self, stages: tuple[str, ...], size: int = 600) -> None:
+        self.stages = stages + ("frame",)
+        self.size = size
+
+        self.samples = {stage: array('q', [0] * size) for stage in self.stages} # Nanoseconds
+        self.counts = {stage: 0 for stage in self.stages}
+
+        self.frame_start = 0
+        self.mark = 0
+
+        self.frames = 0
+        self.stats = {} # stage: (min, avg, p99) in ms, cached for the overlay
+
+    def record(self, stage: str, ns: int) -> None:
+        # Only one thread records each stage, so the buffer and its count don't need a lock
+        count = self.counts[stage]
+        self.samples[stage][count % self.size] = ns
+        self.counts[stage] = count + 1
+
+    def start_frame(self) -> None:
+        self.frame_start = self.mark = perf_counter_ns()
+
+    def lap(self, stage: str) -> None:
+        """Records the time since the frame started or the last lap against `stage`."""
+
+        now = perf_counter_ns()
+        self.record(stage, now - self.mark)
+        self.mark = now
+
+    def end_frame(self) -> None:
+        self.record("frame", perf_counter_ns() - self.frame_start)
+        self.frames += 1
+
+    def get_window(self, stage: str) -> list[int]:
+        """Returns: the buffered samples of `stage`, oldest first."""
+
+        count = self.counts[stage]
+        buffer = self.samples[stage]
+
+        if count <= self.size:
+            return buffer[:count].tolist()
+
+        start = count % self.size
+        return (buffer[start:] + buffer[:start]).tolist()
+
+    def get_stats(self, stage: str) -> tuple[float, float, float] | None:
+        """Returns: (min, avg, p99) in milliseconds, `None` if the stage has no samples yet."""
+
+        window = sorted(self.get_window(stage))
+        if len(window) == 0: return None
+
+        p99 = window[min(len(window) - 1, int(len(window) * 0.99))]
+        return window[0] / 1e6, sum(window) / len(window) / 1e6, p99 / 1e6
+
+    def dump_csv(self, path: str) -> None:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("stage", "sample", "ns"))
+
+            for stage in self.stages:
+                first = max(0, self.counts[stage] - self.size)
+
+                for i, ns in enumerate(self.get_window(stage)):
+                    writer.writerow((stage, first + i, ns))
+
+    def draw(self, x: int, y: int) -> None:
+        if self.frames % self.REFRESH_FRAMES == 0 or len(self.stats) == 0:
+            self.stats = {stage: self.get_stats(stage) for stage in self.stages}
+
+        line_height = self.FONT_SIZE + 4
+        columns = (("min", 170), ("avg", 250), ("p99 ms", 330)) # (heading, x offset) of each statistic
+
+        pr.draw_rectangle(x, y, 430, line_height * (len(self.stages) + 1) + 10, pr.Color(0, 0, 0, 180))
+
+        pr.draw_text("stage", x + 10, y + 5, self.FONT_SIZE, pr.WHITE)
+        for heading, offset in columns:
+            pr.draw_text(heading, x + offset, y + 5, self.FONT_SIZE, pr.WHITE)
+
+        for i, stage in enumerate(self.stages):
+            row_y = y + 5 + line_height * (i + 1)
+            color = pr.YELLOW if stage == "frame" else pr.GREEN
+
+            pr.draw_text(stage, x + 10, row_y, self.FONT_SIZE, color)
+
+            stats = self.stats.get(stage)
+            for j, (heading, offset) in enumerate(columns):
+                pr.draw_text("-" if stats is None else f"{stats[j]:.2f}", x + offset, row_y, self.FONT_SIZE, color)
@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from math import atan, atan2, sin, radians, pi
+
+class SteeringController(ABC):
+    """
+    Turns the tracking error into a wheel position (-1 to 1).
+    Errors are signed so a positive wheel position reduces them:
+        cross_track: world units to the guidance line
+        heading_error: radians between the vehicle heading and the line
+    """
+
+    def __init__(self, settings: dict[str, any], mag: int) -> None:
+        self.mag = mag
+
+        self.wheelbase = float(settings.get("wheelbase", 3.0)) * mag # World units
+        self.max_steer_angle = radians(float(settings.get("max_steer_angle", 40.0))) # Wheel angle at full lock
+
+    @abstractmethod
+    def get_steering(self, cross_track: float, heading_error: float, speed: float, working_width: float) -> float:
+        """Returns: the wheel position (-1 to 1) that reduces the errors."""
+
+class LegacyController(SteeringController):
+    """Original blend of a heading term (a quarter turn of error is full lock) and cross-track in working widths."""
+
+    def get_steering(self, cross_track: float, heading_error: float, speed: float, working_width: float) -> float:
+        return cross_track / working_width + heading_error / (pi / 2)
+
+class PurePursuitController(SteeringController):
+    """Steers along the arc that meets the guidance line a speed dependent look-ahead distance in front of the vehicle."""
+
+    def __init__(self, settings: dict[str, any], mag: int) -> None:
+        super().__init__(settings, mag)
+
+        self.lookahead_time = float(settings.get("lookahead_time", 1.5)) # Seconds
+        self.min_lookahead = float(settings.get("min_lookahead", 4.0)) * mag # World units
+
+    def get_steering(self, cross_track: float, heading_error: float, speed: float, working_width: float) -> float:
+        lookahead = max(self.min_lookahead, speed * self.lookahead_time)
+
+        # Angle to the look-ahead point on the line relative to the vehicle heading
+        along = max(lookahead * lookahead - cross_track * cross_track, 0.0) ** 0.5
+        alpha = atan2(cross_track, along) + heading_error
+
+        return atan(2 * self.wheelbase * sin(alpha) / lookahead) / self.max_steer_angle
+
+class StanleyController(SteeringController):
+    """Front axle controller: heading error plus the angle that closes the cross-track error at the current speed."""
+
+    def __init__(self, settings: dict[str, any], mag: int) -> None:
+        super().__init__(settings, mag)
+
+        self.gain = float(settings.get("stanley_gain", 1.0))
+        self.softening = float(settings.get("stanley_softening", 1.0)) * mag # World units / s, keeps the gain finite at low speed
+
+    def get_steering(self, cross_track: float, heading_error: float, speed: float, working_width: float) -> float:
+        return (heading_error + atan2(self.gain * cross_track, speed + self.softening)) / self.max_steer_angle
+
+CONTROLLERS = {
+    "legacy": LegacyController,
+    "pure_pursuit": PurePursuitController,
+    "stanley": StanleyController
+}
+
+def create_controller(settings: dict[str, any], mag: int) -> SteeringController:
+    name = settings.get("steering_controller", "legacy")
+
+    if name not in CONTROLLERS:
+        print(f"Unknown steering controller: {name}! Using legacy.")
+        name = "legacy"
+
+    return CONTROLLERS[name](settings, mag)
@@ -1,8 +1,9 @@
 import pygame as pg
+import numpy as np
 import math
 import os
 
-from typing import List, Tuple
+from typing import Iterator, List, NamedTuple, Tuple
 
 # https://stackoverflow.com/questions/34372480/rotate-point-about-another-point-in-degrees-python
 def rotate_point_centered(origin: Tuple[float, float], point: Tuple[float, float], angle: float) -> Tuple[int, int]:
@@ -18,6 +19,13 @@ def rotate_point_centered(origin: Tuple[float, float], point: Tuple[float, float
 
     return qx, qy
 
+def draw_body(surface: pg.Surface, center: Tuple[float, float], width: float, height: float, rotation: float, color: Tuple[int, int, int]) -> None:
+    """Draws a `width` x `height` rectangle rotated by `rotation` degrees (clockwise on screen, like the vehicle's rotation)."""
+
+    x, y = center
+    corners = [(x - width / 2, y - height / 2), (x + width / 2, y - height / 2), (x + width / 2, y + height / 2), (x - width / 2, y + height / 2)]
+    pg.draw.polygon(surface, color, [rotate_point_centered(center, corner, math.radians(-rotation)) for corner in corners])
+
 def rotate_image_centered(image: pg.Surface, angle: float, x: float, y: float) -> Tuple[pg.Surface, pg.Rect]:
     rotated_image = pg.transform.rotate(image, angle)
     new_rect = rotated_image.get_rect(center=(x, y))
@@ -94,12 +102,15 @@ class Vehicle:
         self.move(delta_time)
         self.update_rect()
 
-        self.rotate_image_centered(self.rotation)
         self.hitch.update_parent_center(self.rect.center)
 
         rotated_hitch = rotate_point_centered(self.rect.center, self.rect.center + self.hitch.vector, math.radians(-self.rotation))
         self.hitch.update_position(rotated_hitch[0], rotated_hitch[1])
 
+    def draw(self, surface: pg.Surface) -> None:
+        draw_body(surface, self.rect.center, self.width, self.height, self.rotation, (0, 200, 0))
+        pg.draw.line(surface, (255, 255, 255), self.rect.center, self.hitch.position)
+
 class Trailer:
     def __init__(self, vehicle: Vehicle, pos: Tuple[float, float], hitch_offset_x: int, hitch_offset_y: int) -> None:
         self.vehicle: Vehicle = vehicle
@@ -157,12 +168,192 @@ class Trailer:
 
         self.hitch.update_parent_center(self.rect.center)
 
+    def draw(self, surface: pg.Surface) -> None:
+        draw_body(surface, self.rect.center, 30, 10, self.rotation, (200, 0, 0))
+        pg.draw.line(surface, (255, 255, 255), self.rect.center, self.hitch.position)
+
+# Synthetic field driving for benchmarks. Paths are (x, z) in game metres with the tablet's heading convention:
+# a heading of `rotation` degrees drives towards (sin, -cos), so rotation = degrees(atan2(dx, -dz))
+PATH_SPACING = 0.25 # Metres between points of a path before it is resampled in time
+CONTOUR_RADIUS_MARGIN = 0.8 # Fraction of the tightest radius the furthest contour pass may be offset by
+
+class Trajectory(NamedTuple):
+    time: np.ndarray # Seconds
+    vehicle_x: np.ndarray
+    vehicle_z: np.ndarray
+    vehicle_rotation: np.ndarray # Degrees
+    tool_x: np.ndarray
+    tool_z: np.ndarray
+    tool_rotation: np.ndarray # Degrees
+    speed: np.ndarray # Metres / s
+    working: np.ndarray # Tool is lowered and on
+
+def straight(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    count = max(2, int(np.hypot(*(end - start)) / PATH_SPACING) + 1)
+    return start + np.linspace(0.0, 1.0, count)[:, None] * (end - start)
+
+def turn(start: np.ndarray, start_dir: np.ndarray, end: np.ndarray, end_dir: np.ndarray) -> np.ndarray:
+    """Headland turn between two passes as a cubic Hermite curve. For a U-turn between passes `w` apart it bulges `w / 2` past the ends like a half circle."""
+
+    scale = 2 * max(np.hypot(*(end - start)), PATH_SPACING)
+    count = max(2, int(scale * 1.5 / PATH_SPACING))
+
+    t = np.linspace(0.0, 1.0, count)[:, None]
+    t2, t3 = t * t, t * t * t
+
+    return (2 * t3 - 3 * t2 + 1) * start + (t3 - 2 * t2 + t) * scale * start_dir + (-2 * t3 + 3 * t2) * end + (t3 - t2) * scale * end_dir
+
+def get_directions(points: np.ndarray) -> np.ndarray:
+    delta = np.gradient(points, axis=0)
+    return delta / np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 1e-9)[:, None]
+
+def join_passes(passes: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Returns: (points, working) of the passes driven in turn, joined by headland turns the tool is lifted for."""
+
+    pieces = []
+    working = []
+
+    for i, points in enumerate(passes):
+        if i > 0:
+            previous = passes[i - 1]
+            joint = turn(previous[-1], get_directions(previous[-2:])[-1], points[0], get_directions(points[:2])[0])
+
+            pieces.append(joint[1:-1])
+            working.append(np.zeros(len(joint) - 2, dtype=bool))
+
+        pieces.append(points)
+        working.append(np.ones(len(points), dtype=bool))
+
+    return np.concatenate(pieces), np.concatenate(working)
+
+def ab_path(passes: int = 6, length: float = 200.0, work_width: float = 12.0) -> tuple[np.ndarray, np.ndarray]:
+    """Straight back and forth passes along the x axis, `work_width` apart."""
+
+    lines = []
+    for i in range(passes):
+        start = np.array([0.0, i * work_width])
+        end = np.array([length, i * work_width])
+
+        lines.append(straight(start, end) if i % 2 == 0 else straight(end, start))
+
+    return join_passes(lines)
+
+def contour_path(passes: int = 6, length: float = 200.0, work_width: float = 12.0, amplitude: float = 20.0, wavelength: float = 150.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Passes offset from a sine shaped first pass, `work_width` apart along its normal.
+    Offsetting further than the sine's tightest radius (wavelength² / (4π² amplitude)) folds the pass back on itself,
+    so the amplitude is lowered until the furthest pass stays inside it.
+    """
+
+    max_offset = (passes - 1) * work_width
+    if max_offset > 0:
+        amplitude = min(amplitude, CONTOUR_RADIUS_MARGIN * wavelength ** 2 / (4 * np.pi ** 2 * max_offset))
+
+    x = np.linspace(0.0, length, max(2, int(length / PATH_SPACING) + 1))
+    base = np.stack((x, amplitude * np.sin(2 * np.pi * x / wavelength)), axis=1)
+
+    directions = get_directions(base)
+    normals = np.stack((-directions[:, 1], directions[:, 0]), axis=1)
+
+    lines = []
+    for i in range(passes):
+        offset = base + normals * i * work_width
+        lines.append(offset if i % 2 == 0 else offset[::-1])
+
+    return join_passes(lines)
+
+def random_field_path(seed: int = 0) -> tuple[np.ndarray, np.ndarray, float]:
+    """Returns: (points, working, work width) of AB or contour passes over a randomly sized, placed and oriented field."""
+
+    rng = np.random.default_rng(seed)
+
+    work_width = float(rng.choice((3.0, 6.0, 9.0, 12.0, 18.0, 24.0, 36.0)))
+    passes = int(rng.integers(4, 13))
+    length = float(rng.uniform(100.0, 500.0))
+
+    if rng.random() < 0.5:
+        points, working = ab_path(passes, length, work_width)
+    else:
+        points, working = contour_path(passes, length, work_width, float(rng.uniform(5.0, 60.0)), float(rng.uniform(100.0, 400.0)))
+
+    angle = rng.uniform(0.0, 2 * np.pi)
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    origin = rng.uniform(-1000.0, 1000.0, 2)
+
+    return points @ rotation.T + origin, working, work_width
+
+def point_at(points: np.ndarray, distance: np.ndarray, s: np.ndarray) -> np.ndarray:
+    """Points at arc lengths `s` along the path, carried on along the first heading before the start."""
+
+    inside = np.stack((np.interp(s, distance, points[:, 0]), np.interp(s, distance, points[:, 1])), axis=1)
+    before = points[0] + np.minimum(s, 0.0)[:, None] * get_directions(points[:2])[0]
+
+    return np.where((s < 0.0)[:, None], before, inside)
+
+def generate_trajectory(points: np.ndarray, working: np.ndarray, speed: float = 3.0, turn_speed: float = 1.5, hz: float = 20.0, hitch: float = 2.0, drawbar: float = 3.0) -> Trajectory:
+    """
+    Drives `points` at `speed` (slowing to `turn_speed` where `working` is off) and samples the result at `hz`.
+    The tool follows the vehicle's track `hitch + drawbar` metres behind and faces the vehicle's hitch, like `Trailer` does.
+    """
+
+    distance = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))))
+
+    # Time at every path point, then arc length at evenly spaced times
+    point_speed = np.where(working, speed, turn_speed)
+    point_time = np.concatenate(([0.0], np.cumsum(np.diff(distance) / point_speed[1:])))
+
+    time = np.arange(0.0, point_time[-1], 1 / hz)
+    s = np.interp(time, point_time, distance)
+
+    vehicle = point_at(points, distance, s)
+    vehicle_dir = point_at(points, distance, s + PATH_SPACING) - point_at(points, distance, s - PATH_SPACING)
+    vehicle_rotation = np.degrees(np.arctan2(vehicle_dir[:, 0], -vehicle_dir[:, 1])) % 360
+
+    forward = np.stack((np.sin(np.radians(vehicle_rotation)), -np.cos(np.radians(vehicle_rotation))), axis=1)
+    hitch_point = vehicle - forward * hitch
+
+    tool = point_at(points, distance, s - hitch - drawbar)
+    tool_dir = hitch_point - tool
+    tool_rotation = np.degrees(np.arctan2(tool_dir[:, 0], -tool_dir[:, 1])) % 360
+
+    tool_working = np.interp(s - hitch - drawbar, distance, working.astype(float), left=0.0) >= 0.5
+
+    return Trajectory(time, vehicle[:, 0], vehicle[:, 1], vehicle_rotation, tool[:, 0], tool[:, 1], tool_rotation, np.gradient(s, time) if len(time) > 1 else np.zeros(len(time)), tool_working)
+
+def make_trajectory(pattern: str = "ab", seed: int = 0, passes: int = 6, length: float = 200.0, work_width: float = 12.0, speed: float = 3.0, hz: float = 20.0) -> tuple[Trajectory, float]:
+    """Returns: (trajectory, work width) for a "ab", "contour" or "random" field."""
+
+    if pattern == "ab":
+        points, working = ab_path(passes, length, work_width)
+    elif pattern == "contour":
+        points, working = contour_path(passes, length, work_width)
+    elif pattern == "random":
+        points, working, work_width = random_field_path(seed)
+    else:
+        raise Exception(f"Unknown field pattern: {pattern}!")
+
+    return generate_trajectory(points, working, speed, speed / 2, hz), work_width
+
+def to_samples(trajectory: Trajectory, work_width: float, work_offset: float = 0.0) -> Iterator[dict[str, any]]:
+    """Yields the trajectory in the layout the server sends the tablet."""
+
+    columns = zip(*(array.tolist() for array in (trajectory.vehicle_x, trajectory.vehicle_z, trajectory.vehicle_rotation, trajectory.tool_x, trajectory.tool_z, trajectory.tool_rotation, trajectory.working)))
+
+    for seq, (vx, vz, vry, tx, tz, tool_rotation, working) in enumerate(columns):
+        yield {
+            "seq": seq,
+            "vx": vx, "vy": 0.0, "vz": vz, "vry": vry,
+            "tx": tx, "ty": 0.0, "tz": tz, "try": tool_rotation,
+            "toolOn": working, "toolLowered": working,
+            "workWidth": work_width, "workOffset": work_offset
+        }
+
 class Test:
     def __init__(self) -> None:
         self.screen: pg.Surface = pg.display.set_mode((800, 800))
         self.clock: pg.time.Clock = pg.time.Clock()
-        self.vehicle: Vehicle = Vehicle(self.screen, pg.image.load(f"{IMAGES_PATH}/tractor_0.png"), (200.0, 200.0), 0, 14)
-        self.trailer: Trailer = Trailer(self.screen, self.vehicle, pg.image.load(f"{IMAGES_PATH}/tool_0.png"), (240.0, 200.0), 0, -5)
+        self.vehicle: Vehicle = Vehicle((200.0, 200.0), 0, 14)
+        self.trailer: Trailer = Trailer(self.vehicle, (240.0, 200.0), 0, -5)
 
     def main(self) -> None:
         dt: float = 0.0001 # 0 devision errors
@@ -191,8 +382,8 @@ class Test:
             self.vehicle.simulate(dt)
             self.trailer.simulate(dt)
 
-            self.vehicle.draw()
-            self.trailer.draw()
+            self.vehicle.draw(self.screen)
+            self.trailer.draw(self.screen)
 
             pg.display.flip()
             dt = self.clock.tick(60) / 1000 * 60
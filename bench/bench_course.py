@@ -0,0 +1,58 @@
+import os
+import sys
+import math
+import random
+
+from time import perf_counter_ns
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Tablet"))
+
+from course import CourseManager
+from steering import CONTROLLERS
+
+MAG = 16
+WORKING_WIDTH = 6 * MAG
+ITERATIONS = 20000
+
+def make_poses(n: int, seed: int = 0) -> list[tuple[float, float, float, float]]:
+    """Returns: [(x, y, rotation rad, speed), ...] scattered over a few paddocks worth of ground."""
+
+    rng = random.Random(seed)
+    return [(rng.uniform(-20000, 20000), rng.uniform(-20000, 20000), rng.uniform(0, 2 * math.pi), rng.uniform(0, 10 * MAG)) for _ in range(n)]
+
+def make_contour(n: int) -> list[tuple[float, float]]:
+    return [(i * 80.0, 3000 * math.sin(i / 40)) for i in range(n)]
+
+def time_updates(course_manager: CourseManager, poses: list[tuple[float, float, float, float]]) -> float:
+    """Returns: mean nanoseconds per `get_desired_rotation` call."""
+
+    start = perf_counter_ns()
+    for x, y, rotation, speed in poses:
+        course_manager.get_desired_rotation(x, y, rotation, WORKING_WIDTH, speed)
+
+    return (perf_counter_ns() - start) / len(poses)
+
+def run() -> dict[str, float]:
+    poses = make_poses(ITERATIONS)
+    results = {}
+
+    for name, controller in CONTROLLERS.items():
+        course_manager = CourseManager(lambda: WORKING_WIDTH, controller=controller({}, MAG))
+        course_manager.run_dir = 37.0
+
+        results[f"ab_{name}_ns"] = time_updates(course_manager, poses)
+
+    for points in (100, 1000, 10000):
+        course_manager = CourseManager(lambda: WORKING_WIDTH)
+        course_manager.start_contour_recording()
+        for x, y in make_contour(points):
+            course_manager.record_contour_point(x, y)
+        course_manager.finish_contour_recording()
+
+        results[f"contour_{points}_ns"] = time_updates(course_manager, poses)
+
+    return results
+
+if __name__ == "__main__":
+    for name, ns in run().items():
+        print(f"{name:<24} {ns / 1000:8.2f} us/update")
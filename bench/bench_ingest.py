@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+
+from copy import deepcopy
+from lxml import etree
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from ingest import parse_state_xml, parse_state_line, StreamTailer
+
+UPDATES = 5000
+IMPLEMENTS = 2
+ROTATE_BYTES = 256 * 1024 # The writer starts the stream over at this size, like the mod's streamMaxBytes
+POLL_INTERVAL = 0.0005
+
+def make_state(seq: int) -> dict[str, any]:
+    t = seq * 0.05
+    return {
+        "seq": seq, "vx": 100 + t, "vy": 80.0, "vz": -200 + t, "vry": (seq * 0.1) % 360,
+        "tx": 98 + t, "ty": 80.0, "tz": -205 + t, "try": (seq * 0.1) % 360,
+        "toolOn": True, "toolLowered": seq % 50 != 0, "workWidth": 12.0, "workOffset": 0.0,
+        "implements": [{"id": 1000 + i, "tx": 98 + t, "ty": 80.0, "tz": -205 - i * 8 + t, "try": (seq * 0.1) % 360, "width": 12.0 - i * 6, "offset": 0.0, "on": True, "lowered": True} for i in range(IMPLEMENTS)]
+    }
+
+def format_xml(state: dict[str, any]) -> bytes:
+    """Same layout as the mod's writeState."""
+
+    root = etree.Element("state")
+    for key, value in state.items():
+        if key == "implements":
+            implements = etree.SubElement(root, "implements")
+            for record in value:
+                etree.SubElement(implements, "implement", {k: str(v).lower() for k, v in record.items()})
+        else:
+            etree.SubElement(root, key).text = str(value).lower()
+
+    return etree.tostring(root, xml_declaration=True, encoding="utf-8")
+
+def format_line(state: dict[str, any]) -> bytes:
+    """Same layout as the mod's formatStateLine."""
+
+    fields = [
+        "X35",
+        f"{state['seq']:d} {state['vx']:.3f} {state['vy']:.3f} {state['vz']:.3f} {state['vry']:.2f}",
+        f"{state['tx']:.3f} {state['ty']:.3f} {state['tz']:.3f} {state['try']:.2f}",
+        "1" if state["toolOn"] else "0", "1" if state["toolLowered"] else "0",
+        f"{state['workWidth']:.3f} {state['workOffset']:.3f} {len(state['implements']):d}"
+    ]
+
+    for r in state["implements"]:
+        fields.append(f"{r['id']:d} {r['tx']:.3f} {r['ty']:.3f} {r['tz']:.3f} {r['try']:.2f} {r['width']:.3f} {r['offset']:.3f}")
+        fields.append("1" if r["on"] else "0")
+        fields.append("1" if r["lowered"] else "0")
+
+    return (" ".join(fields) + "\n").encode()
+
+def time_xml_reads(path: str) -> float:
+    """Returns: mean microseconds to stat, read and parse state.xml after each save."""
+
+    total = 0
+    for seq in range(UPDATES):
+        with open(path, "wb") as file:
+            file.write(format_xml(make_state(seq)))
+
+        start = time.perf_counter_ns()
+        os.stat(path)
+        with open(path, "rb") as file:
+            data = parse_state_xml(file.read())
+        total += time.perf_counter_ns() - start
+
+    assert data["seq"] == UPDATES - 1
+    return total / UPDATES / 1000
+
+def time_stream_reads(path: str) -> float:
+    """Returns: mean microseconds to read and parse the newest line after each append."""
+
+    open(path, "wb").close()
+    tailer = StreamTailer(path)
+
+    total = 0
+    with open(path, "ab", buffering=0) as file:
+        for seq in range(UPDATES):
+            file.write(format_line(make_state(seq)))
+
+            start = time.perf_counter_ns()
+            data = parse_state_line(tailer.read_lines()[-1])
+            total += time.perf_counter_ns() - start
+
+    tailer.close()
+
+    assert data["seq"] == UPDATES - 1
+    return total / UPDATES / 1000
+
+def stream_throughput(path: str) -> dict[str, float]:
+    """Writer thread appends as fast as it can (starting the file over at ROTATE_BYTES) while the tailer keeps up."""
+
+    open(path, "wb").close()
+    tailer = StreamTailer(path)
+
+    def write() -> None:
+        file = open(path, "ab", buffering=0)
+        size = 0
+
+        for seq in range(UPDATES):
+            line = format_line(make_state(seq))
+            if size + len(line) > ROTATE_BYTES:
+                file.close()
+                file = open(path, "wb", buffering=0)
+                size = 0
+
+            file.write(line)
+            size += len(line)
+
+        file.close()
+
+    writer = threading.Thread(target=write, daemon=True)
+
+    received = 0
+    last_seq = -1
+    start = time.perf_counter()
+    writer.start()
+
+    while last_seq < UPDATES - 1 and time.perf_counter() - start < 30:
+        lines = tailer.read_lines()
+        if len(lines) == 0:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        for line in lines:
+            last_seq = int(parse_state_line(line)["seq"])
+            received += 1
+
+    elapsed = time.perf_counter() - start
+    writer.join()
+    tailer.close()
+
+    return {
+        "stream_lines_per_s": received / elapsed,
+        "stream_received": received / UPDATES # Fraction of lines seen, lines written over by a rotation before a read are lost
+    }
+
+def time_server_packets() -> float:
+    """Returns: mean microseconds to take a parsed sample through the server to the tablet, the same encode/decode steps as DataManager, Server.run and the tablet Client."""
+
+    states = [make_state(seq) for seq in range(UPDATES)]
+
+    start = time.perf_counter_ns()
+    for state in states:
+        curr_data = json.dumps(state) # DataManager.publish
+
+        send_data = deepcopy(json.loads(curr_data)) # Server.run
+        send_data["wheel_disconnect"] = False
+        send_data["wheel_connect"] = False
+        packet = json.dumps(send_data).encode()
+
+        data = json.loads(packet.decode()) # Client.run
+
+    assert data["seq"] == UPDATES - 1
+    return (time.perf_counter_ns() - start) / UPDATES / 1000
+
+def run() -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            "xml_read_us": time_xml_reads(os.path.join(directory, "state.xml")),
+            "stream_read_us": time_stream_reads(os.path.join(directory, "state.log"))
+        }
+        results.update(stream_throughput(os.path.join(directory, "state.log")))
+
+    results["server_packet_us"] = time_server_packets()
+
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<20} {value:10.2f}")
@@ -0,0 +1,124 @@
+import os
+import sys
+import shutil
+import tempfile
+
+from time import perf_counter_ns
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Tablet"))
+
+from headless import HeadlessGPS, TABLET_PATH
+from vehicle_trailer_simulation import make_trajectory, to_samples
+
+import pygame as pg
+
+FRAMES = 2000
+PADDOCK_TILES = (4, 16)
+
+def make_gps() -> HeadlessGPS:
+    """A headless tablet with nothing driven yet. Must be made (and used) inside a scratch working directory."""
+
+    return HeadlessGPS([])
+
+def load_frame(gps: HeadlessGPS, data: dict[str, any]) -> None:
+    gps.client.data = data
+    gps.update_pose()
+
+def time_frames(gps: HeadlessGPS, samples: list[dict[str, any]]) -> dict[str, float]:
+    """Returns: mean microseconds per frame for tile management, visible runlines and per paint stroke."""
+
+    empty_tiles = []
+    tiles_ns = runlines_ns = paint_ns = 0
+    strokes = 0
+
+    for data in samples:
+        load_frame(gps, data)
+
+        start = perf_counter_ns()
+        loaded_textures = gps.update_tiles(empty_tiles)
+        tiles_ns += perf_counter_ns() - start
+
+        # Everything draw_runlines does except the draw calls, which need a GL context
+        start = perf_counter_ns()
+        gps.get_runline_segments()
+        runlines_ns += perf_counter_ns() - start
+
+        swaths = gps.get_swaths(gps.get_bars())
+        if len(swaths) > 0:
+            start = perf_counter_ns()
+            gps.paint(swaths, 1.5*gps.mag/2, loaded_textures)
+            paint_ns += perf_counter_ns() - start
+            strokes += 1
+
+    return {
+        "tiles_us": tiles_ns / len(samples) / 1000,
+        "runlines_us": runlines_ns / len(samples) / 1000,
+        "paint_stroke_us": paint_ns / max(strokes, 1) / 1000
+    }
+
+def fill_tiles(gps: HeadlessGPS, count: int) -> None:
+    """Paints a band across `count` tiles so each one has something to save."""
+
+    paddock = gps.paddock_manager.active_paddock
+    paddock.paint_mask_grid = {}
+    paddock.paint_tex_grid = {} # Headless tiles have no texture to read back
+
+    for i in range(count):
+        mask = pg.Mask((gps.CHUNK_SIZE, gps.CHUNK_SIZE))
+        mask.draw(pg.Mask((gps.CHUNK_SIZE, gps.CHUNK_SIZE // 4), fill=True), (0, (i * 97) % (gps.CHUNK_SIZE * 3 // 4)))
+
+        paddock.paint_mask_grid[(i % 8, i // 8)] = mask
+
+def time_paddock(gps: HeadlessGPS, count: int) -> dict[str, float]:
+    """
+    Returns: milliseconds to save `count` tiles and to decode and merge them back in.
+    Render texture upload needs a GL context so it isn't included, the same as the headless tablet.
+    """
+
+    paddock = gps.paddock_manager.active_paddock
+    fill_tiles(gps, count)
+
+    start = perf_counter_ns()
+    paddock.save()
+    save_ns = perf_counter_ns() - start
+
+    tiles = list(paddock.paint_mask_grid.keys())
+    paddock.paint_mask_grid = {}
+
+    start = perf_counter_ns()
+    paddock._decode_tiles(tiles, paddock.load_generation)
+    while not paddock.pending_tiles.empty():
+        generation, coord, image, mask = paddock.pending_tiles.get_nowait()
+        paddock.paint_mask_grid[coord] = pg.Mask((gps.CHUNK_SIZE, gps.CHUNK_SIZE))
+        paddock.add_coverage(coord, mask)
+    load_ns = perf_counter_ns() - start
+
+    return {
+        f"paddock_save_{count}_ms": save_ns / 1e6,
+        f"paddock_load_{count}_ms": load_ns / 1e6
+    }
+
+def run() -> dict[str, float]:
+    trajectory, work_width = make_trajectory("ab", passes=4, length=300.0)
+    samples = list(to_samples(trajectory, work_width))[:FRAMES]
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(os.path.join(TABLET_PATH, "settings.json"), directory)
+        os.chdir(directory)
+
+        try:
+            gps = make_gps()
+            gps.course_manager.run_dir = 0.0
+
+            results = time_frames(gps, samples)
+            for count in PADDOCK_TILES:
+                results.update(time_paddock(gps, count))
+        finally:
+            os.chdir(cwd)
+
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<24} {value:10.3f}")
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Server"))
+
+from g29 import Wheel
+from g29py import MockG29Device
+
+TARGETS = (0.3, -0.3, 0.05, -0.5, 0.0) # Scripted steering targets, each held for HOLD seconds
+HOLD = 2.0
+SETTLE_TOLERANCE = 0.01
+SAMPLE_PERIOD = 0.001
+
+def run_step(wheel: Wheel, target: float) -> dict[str, float]:
+    start_rot = wheel.get_snapshot().steering
+    direction = 1 if target >= start_rot else -1
+
+    writes = wheel.device.writes
+    cpu = time.process_time()
+    start = time.perf_counter()
+
+    wheel.set_target(target)
+
+    settled_at = None
+    overshoot = 0.0
+
+    while (now := time.perf_counter()) - start < HOLD:
+        error = wheel.get_snapshot().steering - target
+
+        overshoot = max(overshoot, error * direction)
+
+        if abs(error) > SETTLE_TOLERANCE:
+            settled_at = None
+        elif settled_at is None:
+            settled_at = now - start
+
+        time.sleep(SAMPLE_PERIOD)
+
+    elapsed = time.perf_counter() - start
+
+    return {
+        "target": target,
+        "settle_s": settled_at if settled_at is not None else float("nan"),
+        "overshoot": overshoot,
+        "writes_per_s": (wheel.device.writes - writes) / elapsed,
+        "cpu_percent": (time.process_time() - cpu) / elapsed * 100 # Whole process, including this sampler and the mock device
+    }
+
+def run(settings: dict | None = None) -> list[dict[str, float]]:
+    wheel = Wheel(settings or {}, lambda: print("Disconnect by wheel during benchmark!"), lambda: None, MockG29Device())
+
+    try:
+        return [run_step(wheel, target) for target in TARGETS]
+    finally:
+        wheel.release()
+        wheel.connected = False # Stops the pump and actuator threads
+
+if __name__ == "__main__":
+    for result in run():
+        print(f"target {result['target']:+.2f}: settle {result['settle_s']:.3f}s, overshoot {result['overshoot']:.4f}, {result['writes_per_s']:.0f} writes/s, {result['cpu_percent']:.1f}% CPU")
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import subprocess
+
+BENCH_PATH = os.path.dirname(os.path.abspath(__file__))
+BENCHES = ("course", "ingest", "tablet", "wheel") # bench_<name>.py, each with a run() returning its results
+
+RESULT_PREFIX = "BENCH_RESULT "
+TIMEOUT = 600 # Seconds per benchmark
+
+def clean(value: any) -> any:
+    """NaN and infinity aren't valid JSON, they are written as null."""
+
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    elif isinstance(value, dict):
+        return {key: clean(item) for key, item in value.items()}
+    elif isinstance(value, list):
+        return [clean(item) for item in value]
+
+    return value
+
+def run_bench(name: str) -> dict[str, any]:
+    """Runs a benchmark in its own process, the Tablet and Server both have a main module and the Tablet's needs SDL set up before import."""
+
+    code = f"import json, bench_{name}; print({RESULT_PREFIX!r} + json.dumps(bench_{name}.run()))"
+    env = dict(os.environ, G29_MOCK="1")
+
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", code], cwd=BENCH_PATH, env=env, capture_output=True, text=True, timeout=TIMEOUT)
+    elapsed = time.perf_counter() - start
+
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return {"results": clean(json.loads(line[len(RESULT_PREFIX):])), "elapsed_s": elapsed}
+
+    return {"error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"Exited with {process.returncode}", "elapsed_s": elapsed}
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCH_PATH, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the benchmarks and write their results as JSON.")
+    parser.add_argument("benches", nargs="*", default=list(BENCHES), help=f"Benchmarks to run ({', '.join(BENCHES)}), all of them by default")
+    parser.add_argument("--output", default=None, help="File to write the JSON to instead of stdout")
+    args = parser.parse_args()
+
+    for name in args.benches:
+        if name not in BENCHES:
+            parser.error(f"Unknown benchmark: {name}!")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": get_commit(),
+        "host": {
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version()
+        },
+        "benches": {}
+    }
+
+    for name in args.benches:
+        print(f"Running {name}...", file=sys.stderr)
+        report["benches"][name] = run_bench(name)
+
+    text = json.dumps(report, indent=4)
+
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+        print(f"Wrote results to {args.output}.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()